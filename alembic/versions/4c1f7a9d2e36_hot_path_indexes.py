@@ -0,0 +1,61 @@
+"""hot path indexes
+
+Revision ID: 4c1f7a9d2e36
+Revises: b0b21cc2f09c
+Create Date: 2025-10-24 14:31:52.904118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f7a9d2e36'
+down_revision: Union[str, Sequence[str], None] = 'b0b21cc2f09c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên index, bảng, cột, điều kiện partial)
+INDEXES = [
+    ('ix_donation_campaign_id_id', 'donation', ['campaign_id', 'id'], None),
+    ('ix_donation_campaign_id_created_at', 'donation', ['campaign_id', 'created_at', 'id'], None),
+    ('ix_donation_user_id_id', 'donation', ['user_id', 'id'], None),
+    ('ix_donation_created_at', 'donation', ['created_at', 'id'], None),
+    ('ix_donation_code', 'donation', ['code'], None),
+    ('ix_campaign_approved_id', 'campaign', ['id'], "status = 'approved'"),
+    ('ix_campaign_approved_created_at', 'campaign', ['created_at', 'id'], "status = 'approved'"),
+    ('ix_campaign_pending_id', 'campaign', ['id'], "status = 'pending'"),
+    ('ix_campaign_pending_created_at', 'campaign', ['created_at', 'id'], "status = 'pending'"),
+    ('ix_campaign_user_depend_id_status', 'campaign', ['user_depend_id', 'status', 'id'], None),
+    ('ix_campaign_user_depend_id_status_created_at', 'campaign',
+     ['user_depend_id', 'status', 'created_at', 'id'], None),
+    ('ix_campaign_creator_id_id', 'campaign', ['creator_id', 'id'], None),
+    ('ix_campaign_creator_id_created_at', 'campaign', ['creator_id', 'created_at', 'id'], None),
+    ('ix_withdrawal_campaign_id_created_at', 'withdrawal', ['campaign_id', 'created_at'], None),
+    ('ix_withdrawal_status_id', 'withdrawal', ['status', 'id'], None),
+    ('ix_proof_withdrawal_id_id', 'proof', ['withdrawal_id', 'id'], None),
+    ('ix_proof_image_proof_id_id', 'proof_image', ['proof_id', 'id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY không chạy được trong transaction và không khoá
+    # ghi trên bảng; nếu bị ngắt giữa chừng, IF NOT EXISTS cho phép chạy lại
+    # (index INVALID còn sót lại cần DROP thủ công)
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""payment ledger
+
+Revision ID: 7e2b5c8a1f43
+Revises: 4c1f7a9d2e36
+Create Date: 2025-10-27 10:05:41.226917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b5c8a1f43'
+down_revision: Union[str, Sequence[str], None] = '4c1f7a9d2e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payment_ledger',
+    sa.Column('reference', sa.String(), nullable=False),
+    sa.Column('payment_link_id', sa.String(), nullable=True),
+    sa.Column('donation_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.DECIMAL(precision=12, scale=2), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['donation_id'], ['donation.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reference')
+    )
+    op.create_index(op.f('ix_payment_ledger_id'), 'payment_ledger', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_payment_ledger_id'), table_name='payment_ledger')
+    op.drop_table('payment_ledger')
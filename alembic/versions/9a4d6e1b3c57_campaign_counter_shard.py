@@ -0,0 +1,46 @@
+"""campaign counter shard
+
+Revision ID: 9a4d6e1b3c57
+Revises: 7e2b5c8a1f43
+Create Date: 2025-10-28 16:22:09.581340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d6e1b3c57'
+down_revision: Union[str, Sequence[str], None] = '7e2b5c8a1f43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('campaign_counter_shard',
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('current_amount', sa.DECIMAL(precision=12, scale=2), server_default='0', nullable=False),
+    sa.Column('used_amount', sa.DECIMAL(precision=12, scale=2), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaign.id'], ),
+    sa.PrimaryKeyConstraint('campaign_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Gộp phần chưa gộp vào campaign trước khi bỏ bảng
+    op.execute("""
+        UPDATE campaign SET
+            current_amount = campaign.current_amount + totals.current_amount,
+            used_amount = campaign.used_amount + totals.used_amount
+        FROM (
+            SELECT campaign_id, sum(current_amount) AS current_amount, sum(used_amount) AS used_amount
+            FROM campaign_counter_shard GROUP BY campaign_id
+        ) AS totals
+        WHERE campaign.id = totals.campaign_id
+    """)
+    op.drop_table('campaign_counter_shard')
@@ -0,0 +1,96 @@
+"""partition invalidate_token by exp
+
+Revision ID: b0b21cc2f09c
+Revises: d10da2f15801
+Create Date: 2025-10-20 09:12:05.417230
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b0b21cc2f09c'
+down_revision: Union[str, Sequence[str], None] = 'd10da2f15801'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bảng partition yêu cầu cột partition (exp) nằm trong PK và mọi unique index,
+    # nên phải tạo bảng mới rồi chép các token còn hạn sang.
+    op.execute('ALTER TABLE invalidate_token RENAME TO invalidate_token_old')
+    op.execute('ALTER INDEX ix_invalidate_token_id RENAME TO ix_invalidate_token_old_id')
+    op.execute('ALTER INDEX ix_invalidate_token_jti RENAME TO ix_invalidate_token_old_jti')
+    op.execute('ALTER TABLE invalidate_token_old RENAME CONSTRAINT invalidate_token_pkey TO invalidate_token_old_pkey')
+
+    op.execute("""
+        CREATE TABLE invalidate_token (
+            jti VARCHAR NOT NULL,
+            exp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            id INTEGER NOT NULL DEFAULT nextval('invalidate_token_id_seq'),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT invalidate_token_pkey PRIMARY KEY (id, exp)
+        ) PARTITION BY RANGE (exp)
+    """)
+    op.create_index(op.f('ix_invalidate_token_id'), 'invalidate_token', ['id'], unique=False)
+    op.create_index(op.f('ix_invalidate_token_jti'), 'invalidate_token', ['jti', 'exp'], unique=True)
+    op.execute('CREATE TABLE invalidate_token_default PARTITION OF invalidate_token DEFAULT')
+
+    current_month = _month_start(date.today())
+    for offset in range(MONTHS_AHEAD + 1):
+        start = _month_start(current_month, offset)
+        end = _month_start(current_month, offset + 1)
+        op.execute(
+            f'CREATE TABLE invalidate_token_p{start:%Y%m} PARTITION OF invalidate_token'
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    op.execute("""
+        INSERT INTO invalidate_token (jti, exp, id, created_at, updated_at)
+        SELECT jti, exp, id, created_at, updated_at
+        FROM invalidate_token_old
+        WHERE exp > now()
+    """)
+    op.execute('ALTER SEQUENCE invalidate_token_id_seq OWNED BY invalidate_token.id')
+    op.drop_table('invalidate_token_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER TABLE invalidate_token RENAME TO invalidate_token_partitioned')
+    op.execute('ALTER INDEX ix_invalidate_token_id RENAME TO ix_invalidate_token_partitioned_id')
+    op.execute('ALTER INDEX ix_invalidate_token_jti RENAME TO ix_invalidate_token_partitioned_jti')
+    op.execute('ALTER TABLE invalidate_token_partitioned RENAME CONSTRAINT invalidate_token_pkey TO invalidate_token_partitioned_pkey')
+
+    op.create_table('invalidate_token',
+    sa.Column('jti', sa.String(), nullable=False),
+    sa.Column('exp', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('invalidate_token_id_seq')"), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invalidate_token_id'), 'invalidate_token', ['id'], unique=False)
+    op.create_index(op.f('ix_invalidate_token_jti'), 'invalidate_token', ['jti'], unique=True)
+
+    op.execute("""
+        INSERT INTO invalidate_token (jti, exp, id, created_at, updated_at)
+        SELECT jti, exp, id, created_at, updated_at
+        FROM invalidate_token_partitioned
+    """)
+    op.execute('ALTER SEQUENCE invalidate_token_id_seq OWNED BY invalidate_token.id')
+    # Xoá bảng cha sẽ xoá luôn các partition con
+    op.execute('DROP TABLE invalidate_token_partitioned')
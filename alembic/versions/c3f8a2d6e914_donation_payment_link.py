@@ -0,0 +1,30 @@
+"""donation payment link
+
+Revision ID: c3f8a2d6e914
+Revises: 9a4d6e1b3c57
+Create Date: 2025-10-29 09:41:17.302145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d6e914'
+down_revision: Union[str, Sequence[str], None] = '9a4d6e1b3c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('donation', sa.Column('payment_link_id', sa.String(), nullable=True))
+    op.add_column('donation', sa.Column('payment_link', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('donation', 'payment_link')
+    op.drop_column('donation', 'payment_link_id')
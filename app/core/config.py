@@ -23,10 +23,86 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 60 * 24 * 7 * 4
     SECRET_KEY: str
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # Read replica cho các route GET; rỗng = mọi truy vấn đi primary
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10.0
+    # Sau khi user ghi, đọc từ primary trong khoảng này (read-your-writes)
+    DB_STICKY_PRIMARY_SECONDS: int = 5
     PAYOS_CLIENT_ID: str
     PAYOS_API_KEY: str
     PAYOS_CHECKSUM_KEY: str
+    PAYOS_BASE_URL: str = 'https://api-merchant.payos.vn'
+    PAYOS_CONNECT_TIMEOUT: float = 3.0
+    PAYOS_READ_TIMEOUT: float = 10.0
+    PAYOS_POOL_TIMEOUT: float = 5.0
+    PAYOS_MAX_CONNECTIONS: int = 20
+    PAYOS_MAX_RETRIES: int = 2
+    PAYOS_RETRY_BACKOFF: float = 0.2
+    # Mỗi request nạp 0.2 lượt retry vào ngân sách, tối đa 10 lượt
+    PAYOS_RETRY_BUDGET_RATIO: float = 0.2
+    PAYOS_RETRY_BUDGET_MAX: float = 10.0
+    PAYOS_BREAKER_FAILURES: int = 5
+    PAYOS_BREAKER_RESET_SECONDS: float = 30.0
+    # Link thanh toán hết hạn sau khoảng này; donation pending còn hạn được dùng lại link
+    DONATION_LINK_TTL_SECONDS: int = 15 * 60
+    IDEMPOTENCY_TTL: int = 60 * 60 * 24
+    # Lâu hơn một lần gọi PayOS kể cả retry
+    IDEMPOTENCY_LOCK_TTL: int = 60
     REDIS_URL:str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    # Kết nối pub/sub im lặng quá khoảng này thì gửi PING, gấp đôi mà không có PONG thì kết nối lại
+    REDIS_PUBSUB_PING_INTERVAL: float = 5.0
+    CACHE_DEFAULT_TTL: int = 600
+    CACHE_TTL_JITTER: float = 0.1
+    CACHE_STALE_TTL: int = 60
+    CACHE_NEGATIVE_TTL: int = 30
+    CACHE_LOCK_TTL_MS: int = 5000
+    CACHE_WAIT_TIMEOUT: float = 2.0
+    CACHE_LOCAL_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_LOCAL_TTL: float = 5.0
+    PAGINATION_COUNT_TTL: int = 30
+    EXPORT_BATCH_SIZE: int = 1000
+    # Bộ đếm current_amount/used_amount chia shard, gộp định kỳ vào campaign
+    CAMPAIGN_COUNTER_SHARDS: int = 16
+    CAMPAIGN_COUNTER_FOLD_INTERVAL_SECONDS: int = 30  # 0 = không chạy nền, dùng CLI
+    CAMPAIGN_COUNTER_FOLD_BATCH_SIZE: int = 10_000
+    # Webhook PayOS -> Redis Stream -> settlement worker
+    WEBHOOK_STREAM: str = 'payos:webhooks'
+    WEBHOOK_STREAM_MAXLEN: int = 1_000_000
+    WEBHOOK_CONSUMER_GROUP: str = 'settlement'
+    WEBHOOK_WORKERS: int = 1  # số consumer chạy trong mỗi worker app, 0 = chỉ chạy qua CLI
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_BLOCK_MS: int = 5000
+    WEBHOOK_CLAIM_IDLE_MS: int = 60_000
+    WEBHOOK_MAX_DELIVERIES: int = 5
+    WEBHOOK_DEDUP_TTL: int = 60 * 60 * 24
+    REVOKED_TOKEN_BLOOM_CAPACITY: int = 1_000_000
+    REVOKED_TOKEN_BLOOM_ERROR_RATE: float = 0.001
+    REVOKED_TOKEN_RESYNC_INTERVAL_SECONDS: int = 300
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300
+    # Scheme đầu tiên dùng để hash mới, các scheme sau chỉ để verify và được rehash dần
+    PASSWORD_HASH_SCHEMES: list[str] = ['bcrypt']
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    TOKEN_PURGE_INTERVAL_SECONDS: int = 60 * 60  # 0 = không chạy nền, dùng CLI
+    TOKEN_PURGE_BATCH_SIZE: int = 5000
+    TOKEN_PARTITION_MONTHS_AHEAD: int = 2
 
 
 
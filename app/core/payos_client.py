@@ -1,15 +1,199 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import httpx
 from payos import PayOS
-from app.core.config import settings 
-# 1. Khởi tạo client MỘT LẦN DUY NHẤT
-payos_client = PayOS(
-    client_id=settings.PAYOS_CLIENT_ID,
-    api_key=settings.PAYOS_API_KEY,
-    checksum_key=settings.PAYOS_CHECKSUM_KEY
-)
+from payos.custom_error import PayOSError
+from payos.type import CreatePaymentResult, PaymentData, WebhookData
+from payos.utils import createSignatureFromObj, createSignatureOfPaymentRequest
+
+from app.core.config import settings
+from app.helpers.exception_handler import CustomException, ExceptionType
+
+# Lỗi xảy ra trước khi request tới PayOS: gửi lại không sợ tạo trùng link thanh toán
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_RETRYABLE_STATUS = (429, 503)
+
+
+class RetryBudget:
+    """
+    Mỗi request gửi được `ratio` lượt retry, tối đa `max_tokens`, để khi PayOS
+    lỗi hàng loạt thì retry không nhân số request lên.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Mở sau `failure_threshold` lần lỗi liên tiếp: trong `reset_timeout` giây mọi
+    request bị từ chối ngay. Sau đó cho một request thử (half-open), thành công thì đóng lại.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def release_trial(self) -> None:
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_running = False
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+class AsyncPayOS:
+    """
+    Gọi API PayOS qua httpx.AsyncClient dùng chung (giữ kết nối), không chặn
+    event loop như PayOS SDK (requests). Chữ ký HMAC dùng lại hàm của SDK.
+    `base_url`/`transport` cho phép trỏ sang server giả khi test, benchmark.
+    """
+
+    def __init__(self, client_id: str, api_key: str, checksum_key: str,
+                 base_url: str = settings.PAYOS_BASE_URL,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._checksum_key = checksum_key
+        # Xác thực webhook không cần mạng, dùng luôn SDK
+        self._sdk = PayOS(client_id=client_id, api_key=api_key, checksum_key=checksum_key)
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={'x-client-id': client_id, 'x-api-key': api_key},
+            timeout=httpx.Timeout(settings.PAYOS_READ_TIMEOUT, connect=settings.PAYOS_CONNECT_TIMEOUT,
+                                  pool=settings.PAYOS_POOL_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.PAYOS_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.PAYOS_MAX_CONNECTIONS),
+            transport=transport,
+        )
+        self._retry_budget = RetryBudget(ratio=settings.PAYOS_RETRY_BUDGET_RATIO,
+                                         max_tokens=settings.PAYOS_RETRY_BUDGET_MAX)
+        self._breaker = CircuitBreaker(failure_threshold=settings.PAYOS_BREAKER_FAILURES,
+                                       reset_timeout=settings.PAYOS_BREAKER_RESET_SECONDS)
+
+    def verify_webhook(self, webhook_body: dict) -> WebhookData:
+        return self._sdk.verifyPaymentWebhookData(webhook_body)
+
+    async def _post(self, path: str, payload: dict) -> httpx.Response:
+        self._retry_budget.deposit()
+        for attempt in range(settings.PAYOS_MAX_RETRIES + 1):
+            last_attempt = attempt == settings.PAYOS_MAX_RETRIES
+            try:
+                response = await self._http.post(path, json=payload)
+            except _RETRYABLE_ERRORS as e:
+                if last_attempt or not self._retry_budget.withdraw():
+                    raise
+                logging.warning(f'PayOS {path} failed ({e!r}), retrying')
+            else:
+                if response.status_code not in _RETRYABLE_STATUS or last_attempt \
+                        or not self._retry_budget.withdraw():
+                    return response
+                logging.warning(f'PayOS {path} returned {response.status_code}, retrying')
+            await asyncio.sleep(settings.PAYOS_RETRY_BACKOFF * 2 ** attempt)
+
+    async def create_payment_link(self, payment_data: PaymentData) -> CreatePaymentResult:
+        trial = self._breaker.state == 'half_open'
+        if not self._breaker.allow():
+            raise CustomException(error_type=ExceptionType.PAYMENT_UNAVAILABLE)
+        try:
+            payment_data.signature = createSignatureOfPaymentRequest(payment_data, self._checksum_key)
+            response = await self._post('/v2/payment-requests', payment_data.to_json())
+            if response.status_code >= 500 or response.status_code in _RETRYABLE_STATUS:
+                raise PayOSError(code=str(response.status_code), message=response.text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Lỗi mạng, 5xx hay lỗi không lường trước đều tính là một lần lỗi
+            self._breaker.record_failure()
+            raise
+        finally:
+            if trial:
+                # Lần thử half-open bị huỷ thì nhường cho request sau
+                self._breaker.release_trial()
+        # PayOS trả lời (kể cả lỗi nghiệp vụ) nghĩa là dịch vụ vẫn sống
+        self._breaker.record_success()
+
+        body = response.json()
+        if response.status_code != 200 or body.get('code') != '00' or body.get('data') is None:
+            raise PayOSError(code=body.get('code'), message=body.get('desc'))
+        if createSignatureFromObj(body['data'], self._checksum_key) != body.get('signature'):
+            raise PayOSError(code=body.get('code'), message='Response signature mismatch')
+        return CreatePaymentResult(**body['data'])
+
+    def stats(self) -> dict:
+        return {'circuit': self._breaker.state, 'retry_tokens': round(self._retry_budget.tokens, 2)}
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+payos_client: AsyncPayOS | None = None
+
+
+def init_payos_client() -> AsyncPayOS:
+    """Một AsyncPayOS (một connection pool) cho mỗi worker."""
+    global payos_client
+    if payos_client is None:
+        payos_client = AsyncPayOS(
+            client_id=settings.PAYOS_CLIENT_ID,
+            api_key=settings.PAYOS_API_KEY,
+            checksum_key=settings.PAYOS_CHECKSUM_KEY,
+        )
+    return payos_client
+
+
+async def close_payos_client() -> None:
+    global payos_client
+    if payos_client is not None:
+        await payos_client.aclose()
+        payos_client = None
+
 
-# 2. Tạo một dependency function
-def get_payos_client() -> PayOS:
+def get_payos_client() -> AsyncPayOS:
     """
     Dependency để cung cấp PayOS client cho các endpoint.
     """
-    return payos_client
\ No newline at end of file
+    return payos_client if payos_client is not None else init_payos_client()
@@ -1,9 +1,53 @@
-import redis
+import redis.asyncio as redis
 from app.core.config import settings
 
-redis_client = redis.from_url(
-    settings.REDIS_URL, 
-    decode_responses=True
-)
+redis_client: redis.Redis | None = None
+# Client trả về bytes, dùng cho payload đã serialize sẵn (response cache)
+redis_bytes_client: redis.Redis | None = None
+
+
+def _create_client(decode_responses: bool) -> redis.Redis:
+    """
+    BlockingConnectionPool cho request chờ tối đa REDIS_POOL_TIMEOUT khi pool
+    đầy thay vì báo lỗi ngay.
+    """
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        decode_responses=decode_responses,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
+    return redis.Redis.from_pool(pool)
+
+
+def init_redis_client() -> redis.Redis:
+    """Tạo các client asyncio dùng chung cho cả worker."""
+    global redis_client, redis_bytes_client
+    if redis_client is None:
+        redis_client = _create_client(decode_responses=True)
+    if redis_bytes_client is None:
+        redis_bytes_client = _create_client(decode_responses=False)
+    return redis_client
+
+
+async def close_redis_client() -> None:
+    global redis_client, redis_bytes_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+    if redis_bytes_client is not None:
+        await redis_bytes_client.aclose()
+        redis_bytes_client = None
+
+
 def get_redis_client() -> redis.Redis:
-    return redis_client
\ No newline at end of file
+    return redis_client if redis_client is not None else init_redis_client()
+
+
+def get_redis_bytes_client() -> redis.Redis:
+    if redis_bytes_client is None:
+        init_redis_client()
+    return redis_bytes_client
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Union
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+# channel -> danh sách handler nhận payload (str)
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+# Chạy sau mỗi lần subscribe (kể cả lần đầu), để bù các message lỡ mất khi mất kết nối
+_resync_handlers: List[Callable[[], Union[None, Awaitable[None]]]] = []
+_listener_task: asyncio.Task | None = None
+_connected = False
+
+
+def subscribe(channel: str, handler: Callable[[str], None]) -> None:
+    """Đăng ký handler cho một channel. Phải gọi trước start()."""
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def on_resubscribe(handler: Callable[[], Union[None, Awaitable[None]]]) -> None:
+    """Đăng ký hàm đồng bộ lại trạng thái cục bộ sau khi (re)subscribe."""
+    _resync_handlers.append(handler)
+
+
+def connected() -> bool:
+    """False khi listener đang mất kết nối: trạng thái cục bộ có thể đã cũ."""
+    return _connected
+
+
+async def publish(channel: str, message: str) -> None:
+    await get_redis_client().publish(channel, message)
+
+
+def _dispatch(message: dict) -> None:
+    for handler in _handlers.get(message['channel'], []):
+        try:
+            handler(message['data'])
+        except Exception as e:
+            logging.error(f"Pub/sub handler error on '{message['channel']}': {e}")
+
+
+async def _resync() -> None:
+    for handler in _resync_handlers:
+        try:
+            result = handler()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logging.error(f'Pub/sub resync handler error: {e}')
+
+
+def _create_client() -> redis.Redis:
+    """
+    Kết nối riêng cho pub/sub: không có socket_timeout (channel im lặng lâu là
+    bình thường), kết nối chết được phát hiện bằng PING định kỳ trong _listen.
+    """
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=None,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_keepalive=True,
+    )
+
+
+async def _listen() -> None:
+    global _connected
+    client = _create_client()
+    loop = asyncio.get_running_loop()
+    interval = settings.REDIS_PUBSUB_PING_INTERVAL
+    try:
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*_handlers)
+                await pubsub.ping()
+                last_seen = loop.time()
+                while True:
+                    message = await pubsub.get_message(timeout=interval)
+                    if message is not None:
+                        last_seen = loop.time()
+                        if message['type'] == 'message':
+                            _dispatch(message)
+                        elif message['type'] == 'pong' and not _connected:
+                            # Redis trả lời theo thứ tự: PONG đầu tiên nghĩa là SUBSCRIBE
+                            # đã có hiệu lực, từ đây không lỡ message nào nữa
+                            _connected = True
+                            await _resync()
+                        continue
+                    if loop.time() - last_seen >= 2 * interval:
+                        raise ConnectionError('no PONG from Redis')
+                    await pubsub.ping()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Mất kết nối Redis: log rồi subscribe lại; message lỡ mất được bù bởi _resync
+                _connected = False
+                logging.error(f"Pub/sub listener error: {e!r}")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+    finally:
+        _connected = False
+        await client.aclose()
+
+
+def start() -> None:
+    """Mỗi worker giữ một kết nối pub/sub, nghe trên một task nền."""
+    global _listener_task
+    if _listener_task is not None or not _handlers:
+        return
+    _listener_task = asyncio.create_task(_listen())
+
+
+async def stop() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        await asyncio.gather(_listener_task, return_exceptions=True)
+        _listener_task = None
@@ -1,16 +1,29 @@
+import asyncio
+import time
 import jwt
 
-from typing import Any, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional, Tuple, Union
 from app.core.config import settings
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from app.features.users.models import User
+from app.features.auth.schemas import Principal
+from app.helpers.exception_handler import CustomException, ExceptionType
 import uuid
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=settings.PASSWORD_HASH_SCHEMES,
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 
 
-def create_access_token(user: User) -> str:
+def create_access_token(user: Union[User, Principal]) -> str:
     expire = datetime.utcnow() + timedelta(
         seconds=settings.ACCESS_TOKEN_EXPIRE_SECONDS
     )
@@ -37,3 +50,85 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    Chạy bcrypt/argon2 trên thread pool riêng (cả hai đều nhả GIL) để không
+    chặn event loop. Khi hàng đợi vượt max_queue thì từ chối ngay thay vì
+    để request login dồn lại.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        # Các counter chỉ được cập nhật trên event loop
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def _run(self, fn, *args):
+        if self._max_queue and self._in_flight - self._max_workers >= self._max_queue:
+            self._rejected += 1
+            raise CustomException(error_type=ExceptionType.MS_UNAVAILABLE)
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            waited = time.perf_counter() - submitted_at
+            return fn(*args), waited
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(job)
+        self._in_flight += 1
+        # Đếm theo việc thật của thread, không theo request: request bị huỷ (client
+        # ngắt kết nối) thì job vẫn nằm trong hàng đợi hoặc đang chạy
+        def done(f: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._on_job_done, f)
+            except RuntimeError:
+                pass  # Event loop đã đóng (worker đang tắt)
+
+        future.add_done_callback(done)
+        result, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _on_job_done(self, future: Future) -> None:
+        self._in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, waited = future.result()
+        self._completed += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Trả về (hợp lệ, hash mới nếu hash cũ dùng scheme/cost đã lỗi thời)"""
+        return await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self._max_workers,
+            'max_queue': self._max_queue,
+            'in_flight': self._in_flight,
+            'queued': max(self._in_flight - self._max_workers, 0),
+            'completed': self._completed,
+            'rejected': self._rejected,
+            'avg_wait_ms': round(self._wait_total / self._completed * 1000, 3) if self._completed else 0.0,
+            'max_wait_ms': round(self._wait_max * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
@@ -1,20 +1,33 @@
-
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
+from app.db.pool import create_engine
+from app.db.replicas import ReplicaSet, WRITE_FLAG, mark_primary_sticky
 
 # Thay bằng chuỗi kết nối của bạn
 DATABASE_URL = settings.DATABASE_URL
 
-# Tạo engine và session maker
-engine = create_async_engine(DATABASE_URL)
+# Tạo engine và session maker (cấu hình pool: DB_POOL_* trong Settings)
+engine = create_engine(DATABASE_URL, name='primary')
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# Read replica (DATABASE_REPLICA_URLS), dùng qua get_read_db trong app.helpers.deps
+replicas = ReplicaSet(
+    [create_engine(url, name=f'replica{i}') for i, url in enumerate(settings.DATABASE_REPLICA_URLS)],
+    health_timeout=settings.DB_REPLICA_HEALTH_TIMEOUT,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS
+)
+
 class Base(DeclarativeBase):
     pass
 
 # Dependency để cung cấp DB Session cho mỗi request
-async def get_db() -> AsyncGenerator[async_sessionmaker, None]:
+async def get_db(request: Request) -> AsyncGenerator[async_sessionmaker, None]:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+        # principal_id do get_current_principal gắn vào request.state
+        principal_id = getattr(request.state, 'principal_id', None)
+        if session.info.get(WRITE_FLAG) and principal_id is not None:
+            await mark_primary_sticky(principal_id)
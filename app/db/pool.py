@@ -0,0 +1,123 @@
+import bisect
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+# Cận trên (ms) của các bucket trong histogram thời gian chờ lấy connection
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Bộ đếm của một connection pool, ghi nhận qua pool event và _do_get."""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        self._wait_total += seconds
+        self._wait_max = max(self._wait_max, seconds)
+        self._wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+
+    def snapshot(self, pool: AsyncAdaptedQueuePool) -> dict:
+        waits = sum(self._wait_buckets)
+        labels = [f'<={bound}ms' for bound in WAIT_BUCKETS_MS] + [f'>{WAIT_BUCKETS_MS[-1]}ms']
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'invalidations': self.invalidations,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self._wait_total / waits * 1000, 3) if waits else 0.0,
+            'max_wait_ms': round(self._wait_max * 1000, 3),
+            'wait_histogram': dict(zip(labels, self._wait_buckets)),
+        }
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Đo thời gian chờ lấy connection (pool event không có thông tin này)."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() tạo pool mới, giữ lại bộ đếm
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# tên engine -> engine đã gắn metrics
+_engines: Dict[str, AsyncEngine] = {}
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """create_async_engine với cấu hình pool từ Settings và gắn PoolMetrics."""
+    connect_args = {}
+    if make_url(url).get_driver_name() == 'asyncpg':
+        connect_args = {
+            'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+            'prepared_statement_cache_size': settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    metrics = PoolMetrics()
+    engine.pool.metrics = metrics
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine.sync_engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine.sync_engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine.sync_engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    _engines[name] = engine
+    return engine
+
+
+def pool_stats() -> dict:
+    return {name: engine.pool.metrics.snapshot(engine.pool) for name, engine in _engines.items()}
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+STICKY_PREFIX = 'db:sticky:'
+# Cờ trong session.info: session đã ghi (flush hoặc DML) -> user cần đọc từ primary
+WRITE_FLAG = 'wrote'
+
+# Độ trễ replay tính bằng giây; replica đã replay hết WAL nhận được thì coi như 0
+_LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0'
+    ' ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info[WRITE_FLAG] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WRITE_FLAG] = True
+
+
+class ReplicaSet:
+    """
+    Các read replica, chọn xoay vòng (round-robin) trong số replica đang khoẻ.
+    Tình trạng được cập nhật bởi run_health_loop(): replica không trả lời
+    SELECT 1, hoặc trễ hơn `max_lag` giây, bị bỏ qua tới lần kiểm tra sau.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], health_timeout: float, max_lag: float):
+        self._engines = engines
+        self._sessionmakers = [async_sessionmaker(engine, expire_on_commit=False) for engine in engines]
+        self._healthy = [True] * len(engines)
+        self._health_timeout = health_timeout
+        self._max_lag = max_lag
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self._engines)
+
+    def pick(self) -> Optional[async_sessionmaker]:
+        """Sessionmaker của replica kế tiếp, None nếu không còn replica nào khoẻ."""
+        healthy = [i for i, ok in enumerate(self._healthy) if ok]
+        if not healthy:
+            return None
+        return self._sessionmakers[healthy[next(self._counter) % len(healthy)]]
+
+    async def _probe(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self._health_timeout):
+                async with engine.connect() as conn:
+                    if engine.dialect.name != 'postgresql':
+                        await conn.execute(text('SELECT 1'))
+                        return True
+                    lag = await conn.scalar(_LAG_QUERY)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f'Replica {engine.url.host} health check failed: {e}')
+            return False
+        return lag is None or float(lag) <= self._max_lag
+
+    async def check(self) -> None:
+        results = await asyncio.gather(*(self._probe(engine) for engine in self._engines))
+        for i, ok in enumerate(results):
+            if ok != self._healthy[i]:
+                logging.warning(f'Replica {self._engines[i].url.host} is now {"healthy" if ok else "unhealthy"}')
+            self._healthy[i] = ok
+
+    async def run_health_loop(self, interval: float = settings.DB_REPLICA_HEALTH_INTERVAL) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> list:
+        return [{'host': engine.url.host, 'healthy': ok} for engine, ok in zip(self._engines, self._healthy)]
+
+
+async def mark_primary_sticky(principal_id: int) -> None:
+    """Sau khi user ghi, các lần đọc của user trong DB_STICKY_PRIMARY_SECONDS đi primary."""
+    try:
+        await get_redis_client().set(f'{STICKY_PREFIX}{principal_id}', 1,
+                                     ex=settings.DB_STICKY_PRIMARY_SECONDS)
+    except RedisError as e:
+        logging.warning(f'Could not mark primary sticky for {principal_id}: {e}')
+
+
+async def is_primary_sticky(principal_id: int) -> bool:
+    try:
+        return bool(await get_redis_client().exists(f'{STICKY_PREFIX}{principal_id}'))
+    except RedisError as e:
+        # Không biết user vừa ghi hay chưa thì đọc primary cho chắc
+        logging.warning(f'Could not check primary sticky for {principal_id}: {e}')
+        return True
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+# (hàm dựng câu lệnh, tham số mẫu) của các truy vấn nóng, để warm_up() chạy thử
+_hot_statements: List[Tuple[Callable[..., StatementLambdaElement], dict]] = []
+
+
+def hot_statement(**sample_params):
+    """
+    Đánh dấu hàm dựng câu lệnh bằng lambda_stmt: select() bên trong lambda chỉ
+    được dựng và tính cache key một lần, các lần gọi sau chỉ lấy lại giá trị
+    tham số từ closure. `sample_params` dùng để warm_up() chạy thử câu lệnh.
+    """
+    def decorator(builder: Callable[..., StatementLambdaElement]):
+        _hot_statements.append((builder, sample_params))
+        return builder
+
+    return decorator
+
+
+async def warm_up(engine: AsyncEngine, connections: int) -> None:
+    """
+    Chạy các truy vấn nóng trên `connections` connection cùng lúc lúc khởi động:
+    SQL đã compile nằm sẵn trong cache của engine, và mỗi connection asyncpg
+    đã prepare sẵn các câu lệnh (prepared statement cache theo connection).
+    """
+    if not _hot_statements or connections <= 0:
+        return
+    # Giữ connection tới khi tất cả cùng mở, để không dùng lại cùng một connection
+    barrier = asyncio.Barrier(connections)
+
+    async def prime() -> None:
+        try:
+            async with engine.connect() as conn:
+                async with AsyncSession(bind=conn) as session:
+                    for builder, sample_params in _hot_statements:
+                        await session.execute(builder(**sample_params))
+                    await session.rollback()
+                await barrier.wait()
+        except asyncio.BrokenBarrierError:
+            pass
+        except Exception:
+            # Các coroutine khác đang chờ ở barrier
+            await barrier.abort()
+            raise
+
+    results = await asyncio.gather(*(prime() for _ in range(connections)), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        logging.warning(f'Statement warm-up failed: {errors[0]}')
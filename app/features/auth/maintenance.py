@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.db.base import engine
+
+# Khoá advisory để chỉ một worker dọn bảng tại một thời điểm
+TOKEN_PURGE_LOCK_ID = 7_301_001
+PARTITION_PREFIX = 'invalidate_token_p'
+DEFAULT_PARTITION = 'invalidate_token_default'
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    relkind = await conn.scalar(text(
+        "SELECT relkind FROM pg_class WHERE relname = 'invalidate_token' AND relkind IN ('r', 'p')"
+    ))
+    return relkind == 'p'
+
+
+async def _delete_in_batches(conn: AsyncConnection, batch_size: int,
+                             table: str = 'invalidate_token') -> int:
+    """Mỗi batch là một transaction ngắn, SKIP LOCKED để không chờ khoá của ai."""
+    removed = 0
+    while True:
+        result = await conn.execute(text(
+            f'DELETE FROM "{table}" WHERE id IN ('
+            f' SELECT id FROM "{table}" WHERE exp < now()'
+            ' ORDER BY id LIMIT :batch_size FOR UPDATE SKIP LOCKED)'
+        ), {'batch_size': batch_size})
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
+        await asyncio.sleep(0)
+
+
+async def _drop_expired_partitions(conn: AsyncConnection) -> int:
+    """Partition theo tháng: cả tháng đã hết hạn thì detach rồi drop."""
+    current_month = _month_start(datetime.now().date())
+    partitions = (await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i"
+        " JOIN pg_class c ON c.oid = i.inhrelid"
+        " JOIN pg_class p ON p.oid = i.inhparent"
+        " WHERE p.relname = 'invalidate_token' AND c.relname LIKE :prefix"
+    ), {'prefix': f'{PARTITION_PREFIX}%'})).scalars().all()
+
+    dropped = 0
+    for name in partitions:
+        suffix = name[len(PARTITION_PREFIX):]
+        if len(suffix) != 6 or not suffix.isdigit():
+            continue
+        month = date(int(suffix[:4]), int(suffix[4:]), 1)
+        if _month_start(month, 1) > current_month:
+            continue
+        # DETACH ... CONCURRENTLY không dùng được khi có partition DEFAULT;
+        # lock_timeout giữ cho khoá trên bảng cha luôn ngắn, lỗi thì để lần sau
+        await conn.execute(text(f'ALTER TABLE invalidate_token DETACH PARTITION "{name}"'))
+        await conn.execute(text(f'DROP TABLE "{name}"'))
+        dropped += 1
+        logging.info(f'Dropped expired token partition {name}')
+    return dropped
+
+
+async def ensure_token_partitions(conn: AsyncConnection, months_ahead: int) -> None:
+    current_month = _month_start(datetime.now().date())
+    for offset in range(months_ahead + 1):
+        start = _month_start(current_month, offset)
+        end = _month_start(current_month, offset + 1)
+        name = f'{PARTITION_PREFIX}{start:%Y%m}'
+        try:
+            await conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF invalidate_token'
+                f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+        except Exception as e:
+            # Thường do partition DEFAULT đã chứa dữ liệu của khoảng này
+            logging.error(f'Could not create token partition {name}: {e}')
+
+
+async def purge_expired_tokens(batch_size: int = settings.TOKEN_PURGE_BATCH_SIZE,
+                               months_ahead: int = settings.TOKEN_PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Dọn các token đã hết hạn khỏi invalidate_token.
+    Trả về số dòng đã xoá (nếu bảng được partition: số partition đã drop cộng
+    số dòng đã xoá trong partition DEFAULT).
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+        locked = await conn.scalar(text('SELECT pg_try_advisory_lock(:lock_id)'),
+                                   {'lock_id': TOKEN_PURGE_LOCK_ID})
+        if not locked:
+            return 0
+        try:
+            # Chỉ đặt sau khi có khoá, và luôn RESET trước khi trả connection về pool
+            await conn.execute(text("SET lock_timeout = '2s'"))
+            if await _is_partitioned(conn):
+                removed = await _drop_expired_partitions(conn)
+                removed += await _delete_in_batches(conn, batch_size, table=DEFAULT_PARTITION)
+                await ensure_token_partitions(conn, months_ahead)
+            else:
+                removed = await _delete_in_batches(conn, batch_size)
+        finally:
+            try:
+                await conn.execute(text('RESET lock_timeout'))
+            finally:
+                await conn.execute(text('SELECT pg_advisory_unlock(:lock_id)'),
+                                   {'lock_id': TOKEN_PURGE_LOCK_ID})
+    return removed
+
+
+async def run_token_purge_loop(interval: int = settings.TOKEN_PURGE_INTERVAL_SECONDS) -> None:
+    while True:
+        try:
+            removed = await purge_expired_tokens()
+            if removed:
+                logging.info(f'Purged {removed} expired token rows/partitions')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f'Token purge failed: {e}')
+        await asyncio.sleep(interval)
+
+
+async def _main() -> None:
+    try:
+        removed = await purge_expired_tokens()
+        logging.info(f'Purged {removed} expired token rows/partitions')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    # python -m app.features.auth.maintenance
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
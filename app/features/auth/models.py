@@ -1,8 +1,15 @@
 from app.helpers.bases import BareBaseModel
-from sqlalchemy import String, Column, DateTime
+from sqlalchemy import String, Column, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from typing import Optional
 class InvalidateToken(BareBaseModel):
-    jti: Mapped[str] = mapped_column(unique=True, nullable=False,index=True)
-    exp: Mapped[Optional[datetime]]
+    # Bảng được partition theo exp (xem migration b0b21cc2f09c), nên exp phải
+    # nằm trong primary key và trong unique index của jti
+    __table_args__ = (
+        Index('ix_invalidate_token_jti', 'jti', 'exp', unique=True),
+        {'postgresql_partition_by': 'RANGE (exp)'},
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
+    jti: Mapped[str] = mapped_column(nullable=False)
+    exp: Mapped[datetime] = mapped_column(primary_key=True)
@@ -0,0 +1,105 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import redis_pubsub
+from app.core.config import settings
+from app.db.statements import hot_statement
+from app.features.users.models import User
+from .schemas import Principal
+
+PRINCIPAL_CHANNEL = 'auth:principal'
+
+
+class PrincipalCache:
+    """
+    Cache LRU có TTL cho principal đã xác thực, key là digest của token.
+    Mỗi entry hết hạn khi token hết hạn (hoặc sau max_ttl, lấy mốc sớm hơn).
+    """
+
+    def __init__(self, maxsize: int, max_ttl: int):
+        self._maxsize = maxsize
+        self._max_ttl = max_ttl
+        # digest -> (principal, jti, expires_at)
+        self._entries: 'OrderedDict[bytes, Tuple[Principal, str, float]]' = OrderedDict()
+        self._by_user: Dict[int, Set[bytes]] = {}
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, digest: bytes) -> Optional[Tuple[Principal, str]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        principal, jti, expires_at = entry
+        if expires_at <= time.time():
+            self._pop(digest)
+            return None
+        self._entries.move_to_end(digest)
+        return principal, jti
+
+    def put(self, digest: bytes, principal: Principal, jti: str, exp: Optional[int]) -> None:
+        expires_at = time.time() + self._max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._pop(digest)
+        self._entries[digest] = (principal, jti, expires_at)
+        self._by_user.setdefault(principal.id, set()).add(digest)
+        while len(self._entries) > self._maxsize:
+            self._pop(next(iter(self._entries)))
+
+    def evict_user(self, user_id: int) -> None:
+        for digest in list(self._by_user.get(user_id, ())):
+            self._pop(digest)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _pop(self, digest: bytes) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._by_user.get(entry[0].id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[entry[0].id]
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    max_ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+@hot_statement(user_id=0)
+def _principal_query(user_id: int):
+    return lambda_stmt(lambda: select(User.id, User.role, User.status).where(User.id == user_id))
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """
+    Chỉ select các cột phục vụ xác thực. Không load entity User nên không kéo
+    theo relationship (User.campaign là selectin) và không để lại object
+    load dở trong identity map của session.
+    """
+    result = await db.execute(_principal_query(user_id))
+    row = result.first()
+    return Principal.model_validate(row) if row else None
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Xoá principal của user khỏi cache ở worker này và báo cho các worker khác."""
+    principal_cache.evict_user(user_id)
+    await redis_pubsub.publish(PRINCIPAL_CHANNEL, str(user_id))
+
+
+redis_pubsub.subscribe(PRINCIPAL_CHANNEL, lambda user_id: principal_cache.evict_user(int(user_id)))
+# Có thể đã lỡ tin evict trong lúc mất kết nối
+redis_pubsub.on_resubscribe(principal_cache.clear)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import redis_pubsub
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.db.base import AsyncSessionLocal
+from app.helpers.bloom import BloomFilter
+from .models import InvalidateToken
+
+REVOKED_KEY_PREFIX = 'auth:revoked:'
+REVOKED_CHANNEL = 'auth:revoked'
+
+
+class RevocationStore:
+    """
+    Danh sách JTI đã bị thu hồi.
+    - Redis giữ từng JTI với TTL bằng thời điểm hết hạn của token (nguồn tin cậy).
+    - Mỗi worker giữ một Bloom filter, được đồng bộ qua Redis pub/sub, để token
+      chưa từng bị thu hồi được trả lời ngay trong bộ nhớ, không cần I/O.
+      Filter được dựng lại từ DB sau mỗi lần (re)subscribe và định kỳ, vì tin
+      pub/sub có thể bị lỡ; trong lúc mất kết nối pub/sub thì luôn hỏi Redis.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        # JTI nhận được trong lúc warm_up đang dựng filter mới
+        self._pending: Optional[Set[str]] = None
+
+    def _remember(self, jti: str) -> None:
+        self._filter.add(jti)
+        if self._pending is not None:
+            self._pending.add(jti)
+        if self._filter.saturated:
+            logging.warning('Revoked-token Bloom filter is saturated, false positives will increase')
+
+    async def revoke(self, jti: str, exp: int) -> None:
+        ttl = max(int(exp - time.time()), 1)
+        redis_client = get_redis_client()
+        await redis_client.set(f'{REVOKED_KEY_PREFIX}{jti}', 1, ex=ttl)
+        await redis_client.publish(REVOKED_CHANNEL, jti)
+        self._remember(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti not in self._filter and redis_pubsub.connected():
+            return False
+        # Bloom filter có thể dương tính giả -> hỏi lại Redis
+        return bool(await get_redis_client().exists(f'{REVOKED_KEY_PREFIX}{jti}'))
+
+    async def warm_up(self, db: AsyncSession) -> None:
+        """Nạp các JTI còn hạn từ DB vào Bloom filter và bổ sung chúng vào Redis."""
+        now = datetime.now()
+        self._pending = set()
+        try:
+            result = await db.execute(
+                select(InvalidateToken.jti, InvalidateToken.exp).filter(InvalidateToken.exp > now)
+            )
+            rows = result.all()
+            fresh = BloomFilter(self._capacity, self._error_rate)
+            pipe = get_redis_client().pipeline(transaction=False)
+            for jti, exp in rows:
+                fresh.add(jti)
+                ttl = max(int((exp - now).total_seconds()), 1)
+                pipe.set(f'{REVOKED_KEY_PREFIX}{jti}', 1, ex=ttl, nx=True)
+            await pipe.execute()
+            for jti in self._pending:
+                fresh.add(jti)
+            self._filter = fresh
+        finally:
+            self._pending = None
+        logging.info(f'Loaded {len(rows)} revoked tokens into the Bloom filter')
+
+
+revocation_store = RevocationStore(
+    capacity=settings.REVOKED_TOKEN_BLOOM_CAPACITY,
+    error_rate=settings.REVOKED_TOKEN_BLOOM_ERROR_RATE
+)
+
+
+async def resync_revocations() -> None:
+    async with AsyncSessionLocal() as db:
+        await revocation_store.warm_up(db)
+
+
+async def run_revocation_resync_loop(interval: int = settings.REVOKED_TOKEN_RESYNC_INTERVAL_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await resync_revocations()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f'Revoked-token resync failed: {e}')
+
+
+redis_pubsub.subscribe(REVOKED_CHANNEL, revocation_store._remember)
+redis_pubsub.on_resubscribe(resync_revocations)
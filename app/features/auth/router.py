@@ -2,11 +2,11 @@ from fastapi import APIRouter, Depends
 from .schemas import Token, AuthReq
 from .services import AuthService
 from app.helpers.bases import DataResponse
-from app.helpers.deps import get_current_user
+from app.helpers.deps import get_current_principal
 import logging
 from app.db.base import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.features.users.models import User
+from .schemas import Principal
 
 router = APIRouter()
 
@@ -33,7 +33,7 @@ async def refresh(token: str, db: AsyncSession = Depends(get_db),
 async def logout(
         token: str,
         db: AsyncSession = Depends(get_db),
-        user: User = Depends(get_current_user),
+        user: Principal = Depends(get_current_principal),
         auth_service: AuthService = Depends(get_auth_service)
 ):
     await auth_service.log_out(db=db, token=token)
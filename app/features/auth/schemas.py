@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, ConfigDict
 
 
 class Token(BaseModel):
@@ -14,3 +14,11 @@ class TokenPayload(BaseModel):
 class AuthReq(BaseModel):
     email: EmailStr
     password: str
+
+
+class Principal(BaseModel):
+    """Thông tin tối thiểu của người dùng đã xác thực, dùng cho phân quyền"""
+    id: int
+    role: str
+    status: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -2,14 +2,17 @@ import logging
 from datetime import datetime
 import jwt
 from sqlalchemy import select
+from sqlalchemy.orm import raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .schemas import Token, AuthReq
 from app.features.users.models import User
 from .models import InvalidateToken
+from .revocation import revocation_store
+from .principal import load_principal
 from app.core.config import settings
 from app.core.security import (
-    verify_password,
+    password_hasher,
     create_access_token,
     create_refresh_token
 )
@@ -22,16 +25,20 @@ class AuthService:
 
     # ✅ Chuyển sang async, nhận db, thêm self
     async def authenticate(self, db: AsyncSession, data: AuthReq) -> Token:
-        query = select(User).filter(User.email == data.email)
+        query = select(User).options(raiseload(User.campaign)).filter(User.email == data.email)
         result = await db.execute(query)
         user: User | None = result.scalars().first()
 
         if not user:
             raise CustomException(error_type=ExceptionType.USER_NOT_EXITS)
 
-        # verify_password là CPU-bound, không cần await
-        if not verify_password(data.password, user.hash_password):
+        # bcrypt chạy trên thread pool riêng, không chặn event loop
+        is_valid, new_hash = await password_hasher.verify_and_update(data.password, user.hash_password)
+        if not is_valid:
             raise CustomException(error_type=ExceptionType.WRONG_PASSWORD)
+        if new_hash:
+            # Hash cũ dùng scheme/cost đã lỗi thời -> lưu lại hash mới
+            user.hash_password = new_hash
         user.last_login = datetime.now(timezone.utc)
         access_token = create_access_token(user=user)
         refresh_token = create_refresh_token(subject=user.id)
@@ -52,8 +59,8 @@ class AuthService:
                 raise CustomException(error_type=ExceptionType.INVALIDATE_TOKEN)
 
             user_id = int(payload.get('sub'))
-            # ✅ Dùng await db.get() để lấy user theo ID
-            user: User | None = await db.get(User, user_id)
+            # Chỉ cần id/role để ký access token mới
+            user = await load_principal(db, user_id)
 
             if not user:
                 raise CustomException(error_type=ExceptionType.USER_NOT_EXITS)
@@ -79,4 +86,5 @@ class AuthService:
         db.add(invalidated_token)
         # ✅ Dùng await cho commit
         await db.commit()
+        await revocation_store.revoke(jti=jti, exp=exp)
         return 'success'
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import random
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.base import engine
+from .models import CampaignCounterShard
+
+COUNTER_COLUMNS = ('current_amount', 'used_amount')
+# Shard đã chọn cho session, lưu trong session.info
+SHARD_INFO_KEY = 'campaign_counter_shard'
+
+# Chuyển một lô shard vào campaign trong một câu lệnh: tổng
+# (campaign + shard) không đổi với mọi snapshot đọc được.
+# SKIP LOCKED bỏ qua shard đang được một giao dịch chưa commit cộng vào.
+_FOLD_SQL = text("""
+    WITH moved AS (
+        DELETE FROM campaign_counter_shard
+        WHERE (campaign_id, shard) IN (
+            SELECT campaign_id, shard FROM campaign_counter_shard
+            LIMIT :batch_size FOR UPDATE SKIP LOCKED
+        )
+        RETURNING campaign_id, current_amount, used_amount
+    ), totals AS (
+        SELECT campaign_id, sum(current_amount) AS current_amount, sum(used_amount) AS used_amount
+        FROM moved GROUP BY campaign_id
+    )
+    UPDATE campaign SET
+        current_amount = campaign.current_amount + totals.current_amount,
+        used_amount = campaign.used_amount + totals.used_amount
+    FROM totals WHERE campaign.id = totals.campaign_id
+""")
+
+
+async def add(db: AsyncSession, campaign_id: int, column: str, amount: Decimal) -> None:
+    """
+    Cộng `amount` vào bộ đếm `column` của campaign bằng một upsert vào một shard,
+    thay cho SELECT ... FOR UPDATE dòng campaign. Không commit.
+    Mỗi session chỉ dùng một shard, nên một transaction cộng cho nhiều campaign
+    (batch của settlement worker, đã sắp theo campaign_id) luôn khoá theo cùng thứ tự.
+    """
+    if column not in COUNTER_COLUMNS:
+        raise ValueError(f'Unknown campaign counter {column}')
+    shard = db.info.setdefault(SHARD_INFO_KEY, random.randrange(settings.CAMPAIGN_COUNTER_SHARDS))
+    statement = insert(CampaignCounterShard).values(campaign_id=campaign_id, shard=shard, **{column: amount})
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[CampaignCounterShard.campaign_id, CampaignCounterShard.shard],
+        set_={column: getattr(CampaignCounterShard, column) + getattr(statement.excluded, column)},
+    ))
+
+
+async def fold_counters(batch_size: int = settings.CAMPAIGN_COUNTER_FOLD_BATCH_SIZE) -> int:
+    """Gộp các shard vào campaign theo từng lô, trả về số campaign đã cập nhật."""
+    folded = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(_FOLD_SQL, {'batch_size': batch_size})
+        folded += result.rowcount
+        if result.rowcount == 0:
+            return folded
+        await asyncio.sleep(0)
+
+
+async def run_counter_fold_loop(interval: int = settings.CAMPAIGN_COUNTER_FOLD_INTERVAL_SECONDS) -> None:
+    while True:
+        try:
+            await fold_counters()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f'Campaign counter fold failed: {e}')
+        await asyncio.sleep(interval)
+
+
+async def _main() -> None:
+    try:
+        folded = await fold_counters()
+        logging.info(f'Folded counters of {folded} campaigns')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    # python -m app.features.campaigns.counters
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
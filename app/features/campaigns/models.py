@@ -1,16 +1,33 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, Date, Boolean, Text, DECIMAL, func, ForeignKey
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
+from sqlalchemy import String, DateTime, Date, Boolean, Text, DECIMAL, func, ForeignKey, Index, cast, select, text
 from typing import Optional, List
-from app.helpers.bases import BareBaseModel
+from app.helpers.bases import Base, BareBaseModel
 from decimal import Decimal
 from datetime import datetime, date
 from app.helpers.enums import CampaignStatus
 
 class Campaign(BareBaseModel):
+    # Khớp với các cặp filter + sort của CampaignService (migration 4c1f7a9d2e36);
+    # danh sách theo trạng thái dùng partial index
+    __table_args__ = (
+        Index('ix_campaign_approved_id', 'id',
+              postgresql_where=text(f"status = '{CampaignStatus.APPROVED.value}'")),
+        Index('ix_campaign_approved_created_at', 'created_at', 'id',
+              postgresql_where=text(f"status = '{CampaignStatus.APPROVED.value}'")),
+        Index('ix_campaign_pending_id', 'id',
+              postgresql_where=text(f"status = '{CampaignStatus.PENDING.value}'")),
+        Index('ix_campaign_pending_created_at', 'created_at', 'id',
+              postgresql_where=text(f"status = '{CampaignStatus.PENDING.value}'")),
+        Index('ix_campaign_user_depend_id_status', 'user_depend_id', 'status', 'id'),
+        Index('ix_campaign_user_depend_id_status_created_at', 'user_depend_id', 'status', 'created_at', 'id'),
+        Index('ix_campaign_creator_id_id', 'creator_id', 'id'),
+        Index('ix_campaign_creator_id_created_at', 'creator_id', 'created_at', 'id'),
+    )
     title: Mapped[str] = mapped_column(String(255))
     description: Mapped[str] = mapped_column(Text)
     cover_image_url: Mapped[str] = mapped_column(String(150))
     goal_amount: Mapped[Decimal] = mapped_column(DECIMAL(12,2))
+    # Phần đã gộp; phần cộng dồn mới nằm ở CampaignCounterShard, đọc tổng qua current_total/used_total
     current_amount: Mapped[Decimal] = mapped_column(DECIMAL(12,2), default=Decimal('0.00'))
     used_amount: Mapped[Decimal] = mapped_column(DECIMAL(12,2), default=Decimal('0.00'))
     status: Mapped[str] = mapped_column(String(20), default=CampaignStatus.PENDING.value)
@@ -27,3 +44,33 @@ class Campaign(BareBaseModel):
 
     
     
+
+
+class CampaignCounterShard(Base):
+    """
+    Phần cộng dồn chưa gộp của current_amount/used_amount, chia thành
+    CAMPAIGN_COUNTER_SHARDS dòng mỗi campaign để các giao dịch không cùng chờ
+    khoá một dòng. Được gộp định kỳ vào Campaign (xem counters.fold_counters).
+    """
+    campaign_id: Mapped[int] = mapped_column(ForeignKey('campaign.id'), primary_key=True)
+    shard: Mapped[int] = mapped_column(primary_key=True)
+    current_amount: Mapped[Decimal] = mapped_column(DECIMAL(12,2), default=Decimal('0.00'), server_default='0')
+    used_amount: Mapped[Decimal] = mapped_column(DECIMAL(12,2), default=Decimal('0.00'), server_default='0')
+
+
+def _shard_total(column):
+    return (
+        select(func.coalesce(func.sum(column), 0))
+        .where(CampaignCounterShard.campaign_id == Campaign.id)
+        .correlate_except(CampaignCounterShard)
+        .scalar_subquery()
+    )
+
+
+# Tổng thật = phần đã gộp + các shard chưa gộp
+Campaign.current_total = column_property(
+    cast(Campaign.current_amount + _shard_total(CampaignCounterShard.current_amount), DECIMAL(12,2))
+)
+Campaign.used_total = column_property(
+    cast(Campaign.used_amount + _shard_total(CampaignCounterShard.used_amount), DECIMAL(12,2))
+)
@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from typing import Optional, List
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from decimal import Decimal
 from ..users.schemas import UserResponse
 
@@ -19,13 +19,28 @@ class CampaignChoosing(BaseModel):
 class CampaignCreationReq(CampaignBase):
     title: str
 
+class CampaignSummaryResponse(BaseModel):
+    """Dữ liệu cho thẻ campaign trong danh sách (view=summary)."""
+    id: int
+    title: Optional[str] = None
+    cover_image_url: Optional[str] = None
+    goal_amount: Decimal
+    # Campaign.current_total đã cộng các shard chưa gộp
+    current_amount: Optional[Decimal] = Field(validation_alias=AliasChoices('current_total', 'current_amount'))
+    status: str
+    start_date: Optional[date]
+    end_date: Optional[date]
+    creator_id: int
+    model_config = ConfigDict(from_attributes=True)
+
+
 class CampaignResponse(CampaignBase):
     id: int
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
     status: str
-    current_amount: Optional[Decimal]
-    used_amount: Optional[Decimal]
+    current_amount: Optional[Decimal] = Field(validation_alias=AliasChoices('current_total', 'current_amount'))
+    used_amount: Optional[Decimal] = Field(validation_alias=AliasChoices('used_total', 'used_amount'))
     creator: Optional['UserResponse']
     end_date: Optional[date]
     quickly_used: bool
@@ -1,22 +1,41 @@
-from sqlalchemy import select
+from typing import Tuple
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.selectable import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .models import Campaign
 from decimal import Decimal
 from datetime import date, timedelta
-from .schemas import CampaignResponse, CampaignCreationReq, CampaignChoosing
+from .schemas import CampaignResponse, CampaignSummaryResponse, CampaignCreationReq, CampaignChoosing
 from app.helpers.exception_handler import CustomException, ExceptionType
 from app.helpers.paging import PaginationParams, paginate
+from app.db.statements import hot_statement
 from ..users.models import User
+from ..auth.schemas import Principal
 from .mappers import CampaignMapper
-from app.helpers.enums import CampaignStatus
+from app.helpers.enums import CampaignStatus, ListView
 import logging
 
+# Cột cho CampaignSummaryResponse; created_at cần cho cursor khi sort theo nó
+SUMMARY_COLUMNS = (
+    Campaign.id, Campaign.title, Campaign.cover_image_url, Campaign.goal_amount,
+    Campaign.current_total, Campaign.status, Campaign.start_date, Campaign.end_date,
+    Campaign.creator_id, Campaign.created_at,
+)
+
+
+@hot_statement(campaign_id=0)
+def _detail_query(campaign_id: int):
+    return lambda_stmt(lambda: select(Campaign).options(
+        selectinload(Campaign.creator).selectinload(User.user_profile)
+    ).where(Campaign.id == campaign_id))
+
+
 class CampaignService:
     def __init__(self):
         pass
 
-    async def create_campaign(self,data: CampaignCreationReq, db: AsyncSession, user: User) -> CampaignResponse:
+    async def create_campaign(self,data: CampaignCreationReq, db: AsyncSession, user: Principal) -> CampaignResponse:
         if user.status == 'banned':
             raise CustomException(ExceptionType.USER_BANNED)
         campaign = Campaign(
@@ -25,69 +44,69 @@ class CampaignService:
             cover_image_url = data.cover_image_url,
             goal_amount = data.goal_amount,
             end_date = self.calculate_end_date(data.goal_amount),
-            creator = user,
             creator_id=user.id,
         )
         db.add(campaign)
         await db.commit()
         await db.refresh(campaign)
-        res = await db.execute(
-        select(Campaign)
-        .options(
-            selectinload(Campaign.creator).selectinload(User.user_profile)
-        )
-        .where(Campaign.id == campaign.id)
-        )
+        res = await db.execute(_detail_query(campaign.id))
         loaded_campaign = res.scalar_one()
         
         return CampaignMapper.toCampaignResponse(loaded_campaign)
 
-    async def get_all(self,params: PaginationParams, db: AsyncSession):
-        _query = select(Campaign).options(
+    def _list_query(self, view: ListView) -> Tuple[Select, dict]:
+        """
+        view=summary chỉ đọc các cột của thẻ campaign (không load creator) và đi
+        fast path của paginate(): Row -> CampaignSummaryResponse, không qua ORM.
+        """
+        if view == ListView.SUMMARY:
+            return select(*SUMMARY_COLUMNS), {'schema': CampaignSummaryResponse}
+        query = select(Campaign).options(
             selectinload(Campaign.creator)
             .selectinload(User.user_profile)
-        ).filter(Campaign.status == CampaignStatus.APPROVED.value)
-        mapper = CampaignMapper.toCampaignResponse
+        )
+        return query, {'mapper': CampaignMapper.toCampaignResponse}
+
+    async def get_all(self,params: PaginationParams, db: AsyncSession,
+                      view: ListView = ListView.FULL):
+        _query, projection = self._list_query(view)
+        _query = _query.filter(Campaign.status == CampaignStatus.APPROVED.value)
 
         campaigns = await paginate(db=db,
                                    model=Campaign,
                                    query=_query,
-                                   mapper=mapper,
-                                   params=params)
+                                   params=params,
+                                   **projection)
         return campaigns
 
-    async def get_all_pending(self, params: PaginationParams, db: AsyncSession):
-        _query = select(Campaign).options(
-            selectinload(Campaign.creator)
-            .selectinload(User.user_profile)
-        ).filter(Campaign.status == CampaignStatus.PENDING.value)
-        mapper = CampaignMapper.toCampaignResponse
+    async def get_all_pending(self, params: PaginationParams, db: AsyncSession,
+                              view: ListView = ListView.FULL):
+        _query, projection = self._list_query(view)
+        _query = _query.filter(Campaign.status == CampaignStatus.PENDING.value)
 
         campaigns = await paginate(db=db,
                                    model=Campaign,
                                    query=_query,
-                                   mapper=mapper,
-                                   params=params)
+                                   params=params,
+                                   **projection)
         return campaigns
 
     async def get_all_depended(self, params: PaginationParams,
-                               db: AsyncSession, admin: User):
-        _query = select(Campaign).options(
-            selectinload(Campaign.creator)
-            .selectinload(User.user_profile)
-        ).filter(Campaign.status == CampaignStatus.DEPENDED.value,
-                 Campaign.user_depend_id == admin.id)
-        mapper = CampaignMapper.toCampaignResponse
+                               db: AsyncSession, admin: Principal,
+                               view: ListView = ListView.FULL):
+        _query, projection = self._list_query(view)
+        _query = _query.filter(Campaign.status == CampaignStatus.DEPENDED.value,
+                               Campaign.user_depend_id == admin.id)
 
         campaigns = await paginate(db=db,
                                    model=Campaign,
                                    query=_query,
-                                   mapper=mapper,
-                                   params=params)
+                                   params=params,
+                                   **projection)
         return campaigns
     async def choose_campaign(self,campaign_id: int,
                               db: AsyncSession,
-                              admin: User
+                              admin: Principal
                               ) -> CampaignChoosing:
        
         campaign: Campaign | None = await db.get(Campaign, campaign_id)
@@ -95,8 +114,6 @@ class CampaignService:
             raise CustomException(ExceptionType.CAMPAIGN_NOT_FOUND)
         campaign.status=CampaignStatus.DEPENDED.value
         campaign.user_depend_id = admin.id
-        campaign.user_depend_on = admin
-        # admin.campaign_depended.append(campaign) # SQLAlchemy handles this via back_populates
 
         db.add(campaign)
         await db.commit()
@@ -116,28 +133,22 @@ class CampaignService:
         return CampaignChoosing(campaign_id=campaign.id,status=campaign.status)
     async def get_detail(self, campaign_id: int,
                          db: AsyncSession) -> CampaignResponse:
-        query = select(Campaign).options(
-            selectinload(Campaign.creator)
-            .selectinload(User.user_profile)
-        ).filter(Campaign.id == campaign_id)
-        res = await db.execute(query)
+        res = await db.execute(_detail_query(campaign_id))
         campaign: Campaign | None = res.scalar_one_or_none()
         if not campaign:
             raise CustomException(ExceptionType.CAMPAIGN_NOT_FOUND)
         return CampaignMapper.toCampaignResponse(campaign=campaign)
     
-    async def get_campaign_by_current_admin(self,params: PaginationParams, db: AsyncSession, admin: User):
-        query = select(Campaign).options(
-            selectinload(Campaign.creator)
-            .selectinload(User.user_profile)
-        ).filter(Campaign.creator_id == admin.id)
+    async def get_campaign_by_current_admin(self,params: PaginationParams, db: AsyncSession, admin: Principal,
+                                            view: ListView = ListView.FULL):
+        query, projection = self._list_query(view)
+        query = query.filter(Campaign.creator_id == admin.id)
 
-        mapper = CampaignMapper.toCampaignResponse
         campaigns = await paginate(db=db,
                                    model=Campaign,
                                    query=query,
-                                   mapper=mapper,
-                                   params=params)
+                                   params=params,
+                                   **projection)
         return campaigns
     
 
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from app.core.payos_client import get_payos_client
+from app.core.security import password_hasher
+from app.db.base import replicas
+from app.db.pool import pool_stats
+from app.helpers.bases import DataResponse
+from app.helpers.login_manager import permission_required
+from ..auth.schemas import Principal
+
+router = APIRouter()
+
+require_admin_role = permission_required('admin')
+
+
+@router.get('/stats', response_model=DataResponse[dict])
+async def get_stats(admin: Principal = Depends(require_admin_role)):
+    """Số liệu của worker đang xử lý request (mỗi worker gunicorn có pool riêng)."""
+    return DataResponse(data={
+        'db_pool': pool_stats(),
+        'db_replicas': replicas.stats(),
+        'password_hasher': password_hasher.stats(),
+        'payos': get_payos_client().stats(),
+    })
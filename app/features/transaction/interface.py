@@ -1,36 +1,50 @@
 from abc import ABC, abstractmethod
 from decimal import Decimal
-from typing import Optional
+from typing import AsyncIterator, Optional
 from fastapi import Request 
+from payos.type import WebhookData
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .schemas import  DonationReq, WithdrawalCreateReq, WithdrawalResponse, ProofCreateReq, ProofResponse, ProofImageCreateReq, ProofImageResponse
+from .schemas import  DonationReq, DonationResponse, WithdrawalCreateReq, WithdrawalResponse, ProofCreateReq, ProofResponse, ProofImageCreateReq, ProofImageResponse
 from .models import Withdrawal, Proof, ProofImage
+from app.core.payos_client import AsyncPayOS
+from app.helpers.enums import ExportFormat, ListView
 from app.helpers.paging import PaginationParams
-from ..users.models import User
+from ..auth.schemas import Principal
 
 
 class ITransactionService(ABC):
     @abstractmethod
-    async def transaction_handler(self, data: Request, db: AsyncSession):
+    async def transaction_handler(self, data: Request, payos_client: AsyncPayOS) -> Optional[str]:
         pass
 
     @abstractmethod
-    async def create_donation(self, data: DonationReq, db: AsyncSession, user: User):
+    async def settle_payment(self, webhook: WebhookData, db: AsyncSession) -> Optional[DonationResponse]:
         pass
 
     @abstractmethod
-    async def get_all_donation(self, db: AsyncSession, user: User | None = None):
+    async def create_donation(self, data: DonationReq, db: AsyncSession, user: Principal | None,
+                              payos_client: AsyncPayOS) -> dict:
         pass
 
     @abstractmethod
-    async def get_all_donation_by_campaign(self, campaign_id: int, params: PaginationParams, db: AsyncSession):
+    async def get_all_donation(self, db: AsyncSession, user: Principal | None = None,
+                               params: PaginationParams = None, view: ListView = ListView.FULL):
+        pass
+
+    @abstractmethod
+    async def get_all_donation_by_campaign(self, campaign_id: int, params: PaginationParams, db: AsyncSession,
+                                           view: ListView = ListView.FULL):
         pass
 
     @abstractmethod
     async def get_all_donation_by_user(self, user_id: int, params: PaginationParams, db: AsyncSession):
         pass
 
+    @abstractmethod
+    def export_donations_by_campaign(self, campaign_id: int, fmt: ExportFormat) -> AsyncIterator[bytes]:
+        pass
+
     # Withdrawal
     @abstractmethod
     async def create_withdrawal(self, data: WithdrawalCreateReq, db: AsyncSession) -> WithdrawalResponse:
@@ -40,6 +54,10 @@ class ITransactionService(ABC):
     async def get_all_withdrawals(self, params: PaginationParams, db: AsyncSession):
         pass
 
+    @abstractmethod
+    def export_withdrawals_by_campaign(self, campaign_id: int, fmt: ExportFormat) -> AsyncIterator[bytes]:
+        pass
+
     @abstractmethod
     async def get_withdrawal_detail(self, withdrawal_id: int, db: AsyncSession) -> WithdrawalResponse:
         pass
@@ -1,12 +1,20 @@
 from app.helpers.bases import BareBaseModel
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Boolean, String, DECIMAL, func, ForeignKey, Text, DateTime
+from sqlalchemy import Boolean, String, DECIMAL, JSON, func, ForeignKey, Text, DateTime, Index
 from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime
 
 
 class Donation(BareBaseModel):
+    # Khớp với các cặp filter + sort của DonationService (migration 4c1f7a9d2e36)
+    __table_args__ = (
+        Index('ix_donation_campaign_id_id', 'campaign_id', 'id'),
+        Index('ix_donation_campaign_id_created_at', 'campaign_id', 'created_at', 'id'),
+        Index('ix_donation_user_id_id', 'user_id', 'id'),
+        Index('ix_donation_created_at', 'created_at', 'id'),
+        Index('ix_donation_code', 'code'),
+    )
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey('user.id'))
     user: Mapped[Optional['User']] = relationship(back_populates='donation',foreign_keys='Donation.user_id')
     user_name: Mapped[Optional[str]] = mapped_column(String)
@@ -20,11 +28,18 @@ class Donation(BareBaseModel):
     bank_name: Mapped[Optional[str]] = mapped_column(String)
     status: Mapped[str] = mapped_column(String, default='pending')
     code: Mapped[Optional[str]] = mapped_column(String)
+    # Link thanh toán PayOS đã tạo (CreatePaymentResult.to_json()), dùng lại khi donor tạo lại
+    payment_link_id: Mapped[Optional[str]] = mapped_column(String)
+    payment_link: Mapped[Optional[dict]] = mapped_column(JSON)
 
     
 
 
 class Withdrawal(BareBaseModel):
+    __table_args__ = (
+        Index('ix_withdrawal_campaign_id_created_at', 'campaign_id', 'created_at'),
+        Index('ix_withdrawal_status_id', 'status', 'id'),
+    )
     campaign: Mapped['Campaign'] = relationship(back_populates='withdrawal')
     campaign_id: Mapped[int] = mapped_column(ForeignKey('campaign.id'))
     amount: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
@@ -38,6 +53,9 @@ class Withdrawal(BareBaseModel):
 
 
 class Proof(BareBaseModel):
+    __table_args__ = (
+        Index('ix_proof_withdrawal_id_id', 'withdrawal_id', 'id'),
+    )
     withdrawal_id: Mapped[int] = mapped_column(ForeignKey('withdrawal.id'))
     withdrawal: Mapped['Withdrawal'] = relationship(back_populates='proof',foreign_keys='Proof.withdrawal_id')
     proof_image: Mapped[List['ProofImage']] = relationship(back_populates='proof', cascade='all, delete-orphan')
@@ -49,6 +67,9 @@ class Proof(BareBaseModel):
 
 
 class ProofImage(BareBaseModel):
+    __table_args__ = (
+        Index('ix_proof_image_proof_id_id', 'proof_id', 'id'),
+    )
     image_url: Mapped[str] = mapped_column(String(200))
     proof: Mapped['Proof'] = relationship(back_populates='proof_image')
     proof_id: Mapped[int] = mapped_column(ForeignKey('proof.id'))
@@ -63,4 +84,11 @@ class TransactionError(BareBaseModel):
     status: Mapped[Optional[str]] = mapped_column(String, default='pending')
 
     
-    
\ No newline at end of file
+    
+
+class PaymentLedger(BareBaseModel):
+    """Mỗi giao dịch PayOS đã ghi nhận một dòng; unique reference chặn ghi nhận hai lần."""
+    reference: Mapped[str] = mapped_column(String, unique=True)
+    payment_link_id: Mapped[Optional[str]] = mapped_column(String)
+    donation_id: Mapped[int] = mapped_column(ForeignKey('donation.id'))
+    amount: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
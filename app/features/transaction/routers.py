@@ -1,22 +1,23 @@
 from fastapi import APIRouter, Depends, Request
 
-from app.core.payos_client import get_payos_client
-from payos import PayOS
-from typing import Any
+from app.core.payos_client import AsyncPayOS, get_payos_client
+from typing import Any, Optional, Union
 from .services import DonationService
-from app.helpers.deps import get_current_user, get_current_user_optional
+from app.helpers.deps import get_current_principal_optional, get_read_db
 from app.helpers.bases import DataResponse
-from app.helpers.paging import Page, PaginationParams
+from app.helpers.paging import Page, PaginationParams, pagination_params
 from app.features.transaction.models import Donation
-from app.features.users.models import User
+from app.features.auth.schemas import Principal
 from app.helpers.login_manager import permission_required
 from app.db.base import get_db
-import json
-import redis
-from app.core.redis_client import get_redis_client
+from app.helpers.cache import RouteCache, cached_route, invalidate
+from app.helpers.idempotency import IdempotentRequest, idempotent
+from app.helpers.enums import ExportFormat, ListView
+from app.helpers.export import export_response
 from app.features.transaction.schemas import (
     DonationReq,
     DonationResponse,
+    DonationSummaryResponse,
     WithdrawalCreateReq,
     WithdrawalResponse,
     ProofCreateReq,
@@ -28,6 +29,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+require_admin_role = permission_required("admin")
+
 
 def get_donation_service() -> DonationService:
     return DonationService()
@@ -38,48 +41,66 @@ async def create_donation(
     data: DonationReq,
     db: AsyncSession = Depends(get_db),
     donation_service: DonationService = Depends(get_donation_service),
-    user: User | None = Depends(get_current_user_optional),
-    payos_client: PayOS = Depends(get_payos_client),
+    user: Principal | None = Depends(get_current_principal_optional),
+    payos_client: AsyncPayOS = Depends(get_payos_client),
+    idempotency: IdempotentRequest = Depends(idempotent("donation")),
 ):
-    res = await donation_service.create_donation(data, db, user, payos_client)
-    return DataResponse(data=res)
+    # Client gửi lại cùng Idempotency-Key nhận lại đúng link đã tạo
+    async def create():
+        res = await donation_service.create_donation(data, db, user, payos_client)
+        await invalidate("donations", f"donations:campaign:{data.campaign_id}")
+        return res
 
+    return await idempotency.run(create, data, owner=user.id if user else None)
 
-@router.get("/donation", response_model=Page[DonationResponse])
+
+@router.get(
+    "/donation", response_model=Page[Union[DonationResponse, DonationSummaryResponse]]
+)
 async def get_all_donation(
     db: AsyncSession = Depends(get_db),
     donation_service: DonationService = Depends(get_donation_service),
-    user: User = Depends(get_current_user_optional),
-    params: PaginationParams = Depends(),
-    redis_client: redis.Redis = Depends(get_redis_client),
-):
-    cache_key = f"donation:page_{params.page}:size_{params.page_size}"
-    cached_donations =  redis_client.get(cache_key)
-    if cached_donations:
-        return Page[DonationResponse].model_validate(json.loads(cached_donations))
-    res = await donation_service.get_all_donation(db, user, params)
-    redis_client.set(cache_key, res.model_dump_json(), ex=600)
-    return res
+    user: Principal | None = Depends(get_current_principal_optional),
+    params: PaginationParams = Depends(pagination_params("id", "created_at")),
+    view: ListView = ListView.FULL,
+    cache: RouteCache = Depends(cached_route("donation", namespaces=["donations"])),
+):
+    return await cache.fetch(
+        lambda: donation_service.get_all_donation(db, user, params, view=view)
+    )
 
 
-@router.get("/donation/campaign/{campaign_id}", response_model=Page[DonationResponse])
+@router.get(
+    "/donation/campaign/{campaign_id}",
+    response_model=Page[Union[DonationResponse, DonationSummaryResponse]],
+)
 async def get_all_donation_by_campaign(
     campaign_id: int,
     db: AsyncSession = Depends(get_db),
     donation_service: DonationService = Depends(get_donation_service),
-    params: PaginationParams = Depends(),
-    redis_client: redis.Redis = Depends(get_redis_client),
+    params: PaginationParams = Depends(pagination_params("id", "created_at")),
+    view: ListView = ListView.FULL,
+    cache: RouteCache = Depends(cached_route(
+        "donation:campaign_{campaign_id}",
+        namespaces=["donations:campaign:{campaign_id}"],
+    )),
 ):
-    cache_key = (
-        f"donation:campaign_{campaign_id}:page_{params.page}:size_{params.page_size}"
+    return await cache.fetch(
+        lambda: donation_service.get_all_donation_by_campaign(
+            campaign_id, params, db, view=view
+        )
     )
-    cached_donations = await redis_client.get(cache_key)
-    if cached_donations:
-        return Page[DonationResponse].model_validate(json.loads(cached_donations))
 
-    res = await donation_service.get_all_donation_by_campaign(campaign_id, params, db)
-    redis_client.set(cache_key, res.model_dump_json(), ex=600)
-    return res
+
+@router.get("/donation/campaign/{campaign_id}/export")
+async def export_donations_by_campaign(
+    campaign_id: int,
+    format: ExportFormat = ExportFormat.NDJSON,
+    admin: Principal = Depends(require_admin_role),
+    donation_service: DonationService = Depends(get_donation_service),
+):
+    rows = donation_service.export_donations_by_campaign(campaign_id, format)
+    return export_response(rows, format, f"donations_campaign_{campaign_id}")
 
 
 # Withdrawal routes
@@ -90,26 +111,39 @@ async def create_withdrawal(
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.create_withdrawal(data, db)
+    # Rút khẩn cấp cập nhật quickly_used của campaign
+    await invalidate(f"campaign:{data.campaign_id}", "campaigns")
     return DataResponse(data=res)
 
 
 @router.get("/withdrawals/{status}", response_model=Page[WithdrawalResponse])
 async def list_withdrawals(
     status: str,
-    params: PaginationParams = Depends(),
-    db: AsyncSession = Depends(get_db),
+    params: PaginationParams = Depends(pagination_params("id")),
+    db: AsyncSession = Depends(get_read_db),
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.get_all_withdrawals(status, params, db)
     return res
 
 
+@router.get("/withdrawals/campaign/{campaign_id}/export")
+async def export_withdrawals_by_campaign(
+    campaign_id: int,
+    format: ExportFormat = ExportFormat.NDJSON,
+    admin: Principal = Depends(require_admin_role),
+    service: DonationService = Depends(get_donation_service),
+):
+    rows = service.export_withdrawals_by_campaign(campaign_id, format)
+    return export_response(rows, format, f"withdrawals_campaign_{campaign_id}")
+
+
 @router.get(
     "/withdrawals/{withdrawal_id}", response_model=DataResponse[WithdrawalResponse]
 )
 async def get_withdrawal_detail(
     withdrawal_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.get_withdrawal_detail(withdrawal_id, db)
@@ -140,8 +174,8 @@ async def create_proof(
 @router.get("/withdrawals/{withdrawal_id}/proofs", response_model=Page[ProofResponse])
 async def list_proofs_by_withdrawal(
     withdrawal_id: int,
-    params: PaginationParams = Depends(),
-    db: AsyncSession = Depends(get_db),
+    params: PaginationParams = Depends(pagination_params("id")),
+    db: AsyncSession = Depends(get_read_db),
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.get_proofs_by_withdrawal(withdrawal_id, params, db)
@@ -151,7 +185,7 @@ async def list_proofs_by_withdrawal(
 @router.get("/proofs/{proof_id}", response_model=DataResponse[ProofResponse])
 async def get_proof_detail(
     proof_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.get_proof_detail(proof_id, db)
@@ -182,8 +216,8 @@ async def add_proof_image(
 @router.get("/proofs/{proof_id}/images", response_model=Page[ProofImageResponse])
 async def list_proof_images(
     proof_id: int,
-    params: PaginationParams = Depends(),
-    db: AsyncSession = Depends(get_db),
+    params: PaginationParams = Depends(pagination_params("id")),
+    db: AsyncSession = Depends(get_read_db),
     service: DonationService = Depends(get_donation_service),
 ):
     res = await service.get_proof_images_by_proof(proof_id, params, db)
@@ -200,12 +234,13 @@ async def delete_proof_image(
     return DataResponse(data=res)
 
 
-@router.post("/webhooks", response_model=DataResponse[DonationResponse])
+@router.post("/webhooks", response_model=DataResponse[Optional[str]])
 async def webhooks(
     data: Request,
-    db: AsyncSession = Depends(get_db),
     service: DonationService = Depends(get_donation_service),
-    payos_client: PayOS = Depends(get_payos_client),
+    payos_client: AsyncPayOS = Depends(get_payos_client),
 ):
-    res = await service.transaction_handler(data, db, payos_client)
+    # Trả về id của message trong stream (None nếu là webhook gửi lại);
+    # cache được settlement worker invalidate
+    res = await service.transaction_handler(data, payos_client)
     return DataResponse(data=res)
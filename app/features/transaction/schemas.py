@@ -49,6 +49,13 @@ class DonationResponse(DonationBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class DonationSummaryResponse(DonationBase):
+    """view=summary: bỏ thông tin ngân hàng và mã giao dịch."""
+    user_name: Optional[str] = None
+    anonymous_name: Optional[str] = None
+    status: Optional[str]
+
+
 class DonationReq(BaseModel):
     campaign_id: int
     message: Optional[str] = None
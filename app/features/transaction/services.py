@@ -1,6 +1,7 @@
 from .schemas import (
     DonationReq,
     DonationResponse,
+    DonationSummaryResponse,
     WithdrawalCreateReq,
     WithdrawalResponse,
     ProofCreateReq,
@@ -8,94 +9,141 @@ from .schemas import (
     ProofImageCreateReq,
     ProofImageResponse,
 )
-from .models import Donation, TransactionError, Withdrawal, Proof, ProofImage
+from .models import Donation, PaymentLedger, Withdrawal, Proof, ProofImage
 from app.helpers.exception_handler import CustomException, ExceptionType
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..campaigns.models import Campaign
-from ..users.models import User
+from ..campaigns import counters
+from ..auth.schemas import Principal
 from .mappers import TransactionMapper
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, Request
-from payos import PayOS, PaymentData
+from payos import PaymentData
 from payos.type import WebhookData
-import re
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
 from app.helpers.paging import paginate, PaginationParams
 from decimal import Decimal
-from typing import Optional
+from typing import AsyncIterator, Optional
 from .interface import ITransactionService
-from app.helpers.enums import WithdrawalStatus
-class DonationService(ITransactionService):
-    def __init__(self):
-        pass
+from app.helpers.enums import ExportFormat, ListView, WithdrawalStatus
+from app.helpers.export import stream_rows
+from .webhook_stream import enqueue_webhook
+from app.core.config import settings
+from app.core.payos_client import AsyncPayOS
 
-    async def transaction_handler(self, data: Request, db: AsyncSession, payos_client: PayOS):
-        webhook_body = await data.json()
-
-        try:
-            verified_data: WebhookData = payos_client.verifyPaymentWebhookData(webhook_body) # Có thể raise Exception
-
-            original_description = verified_data['description']
-            amount = verified_data['amount']
-            bank_number = verified_data['counterAccountNumber']
-            bank_name = verified_data['counterAccountName']
+# Cột cho DonationSummaryResponse; created_at cần cho cursor khi sort theo nó
+DONATION_SUMMARY_COLUMNS = (
+    Donation.id, Donation.campaign_id, Donation.amount, Donation.message,
+    Donation.user_name, Donation.anonymous_name, Donation.status, Donation.created_at,
+)
 
-            # 1. Trích xuất campaign_id từ giữa hai chuỗi 'brm'
-            campaign_id_match = re.search(r'brm(\d+)brm', original_description)
 
-            # 2. Trích xuất new_code là chuỗi bắt đầu bằng 'TSS'
-            new_code_match = re.search(r'(TSS.*)', original_description)
+# Sequence của cột donation.id (SERIAL)
+DONATION_ID_SEQUENCE = 'donation_id_seq'
+# Không dùng lại link sắp hết hạn
+LINK_REUSE_MARGIN_SECONDS = 60
 
-            # 3. Kiểm tra xem cả hai thông tin có hợp lệ không
-            if not campaign_id_match or not new_code_match:
-                raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message=f"Invalid transaction code format: {original_description}")
 
-            campaign_id = campaign_id_match.group(1)
-            new_code = new_code_match.group(1)
+class DonationService(ITransactionService):
+    def __init__(self):
+        pass
 
-            res_donate = await db.execute(
-                select(Donation).filter(Donation.code == new_code)
-            )
-            donation: Donation | None = res_donate.scalar_one_or_none()
-            if not donation:
-                transaction_err = TransactionError(
-                    bank_name=bank_name,
-                    bank_number=bank_number,
-                    amount=amount,
-                    content=original_description,
-                    status='pending'
-                )
-                db.add(transaction_err)
-                await db.commit()
-                raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message='Donation not found')
-            campaign = await db.get(Campaign, campaign_id, with_for_update=True)
-            donation.amount = Decimal(amount)
-            donation.bank_number = bank_number
-            donation.bank_name = bank_name
-            donation.status = 'success'
-            campaign.current_amount += Decimal(amount)
-            await db.commit()
-            await db.refresh(donation)
-            await db.refresh(campaign)
-            return TransactionMapper.to_donation_response(donation)
+    async def transaction_handler(self, data: Request, payos_client: AsyncPayOS) -> Optional[str]:
+        """
+        Chỉ xác thực chữ ký rồi đưa vào Redis Stream, trả lời PayOS ngay;
+        settlement worker (settlement.py) ghi nhận giao dịch sau.
+        """
+        webhook_body = await data.json()
+        try:
+            verified_data: WebhookData = payos_client.verify_webhook(webhook_body)
         except Exception as e:
-            # Bắt các lỗi chung khác (lỗi database, logic,...)
             raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message=str(e))
+        return await enqueue_webhook(verified_data)
 
+    async def settle_payment(self, webhook: WebhookData, db: AsyncSession) -> Optional[DonationResponse]:
+        """
+        Ghi nhận một giao dịch đã xác thực vào donation và campaign.
+        Không commit: settlement worker commit một lần cho cả batch.
+        Donation lấy theo khoá chính orderCode (create_donation đặt orderCode=donation.id).
+        Giao dịch đã ghi nhận (PayOS gửi lại, stream giao lại) dừng ở INSERT vào
+        payment_ledger (unique reference), trước khi cộng vào campaign; khi đó trả về None.
+        current_amount được cộng vào một shard (campaigns.counters), không khoá dòng campaign.
+        """
+        donation: Donation | None = await db.get(Donation, webhook.orderCode)
+        if not donation:
+            raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message='Donation not found')
+        recorded = await db.scalar(
+            insert(PaymentLedger)
+            .values(reference=webhook.reference, payment_link_id=webhook.paymentLinkId,
+                    donation_id=donation.id, amount=Decimal(webhook.amount))
+            .on_conflict_do_nothing(index_elements=[PaymentLedger.reference])
+            .returning(PaymentLedger.id)
+        )
+        if recorded is None:
+            return None
+        if donation.campaign_id is None:
+            raise CustomException(error_type=ExceptionType.CAMPAIGN_NOT_FOUND)
+        # Cộng ngay trên DB: donation được nạp một lần cho cả batch, không khoá,
+        # nên cộng trên object có thể ghi đè lần cộng của consumer khác
+        donation = await db.scalar(
+            update(Donation)
+            .where(Donation.id == donation.id)
+            .values(amount=Donation.amount + Decimal(webhook.amount),
+                    bank_number=webhook.counterAccountNumber,
+                    bank_name=webhook.counterAccountName,
+                    status='success')
+            .returning(Donation)
+            .execution_options(populate_existing=True)
+        )
+        await counters.add(db, donation.campaign_id, 'current_amount', Decimal(webhook.amount))
+        return TransactionMapper.to_donation_response(donation)
 
+    async def _pending_payment_link(self, db: AsyncSession, user_id: int, campaign_id: int) -> Optional[dict]:
+        """Link còn hạn của donation chưa thanh toán gần nhất của user cho campaign này."""
+        created_after = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.DONATION_LINK_TTL_SECONDS - LINK_REUSE_MARGIN_SECONDS)
+        return await db.scalar(
+            select(Donation.payment_link)
+            .where(Donation.user_id == user_id, Donation.campaign_id == campaign_id,
+                   Donation.status == 'pending', Donation.payment_link_id.is_not(None),
+                   Donation.created_at >= created_after)
+            .order_by(Donation.id.desc())
+            .limit(1)
+        )
 
-             
+    async def create_donation(self, data: DonationReq, db: AsyncSession, user: Principal | None, payos_client: AsyncPayOS)-> dict:
+        campaign_id = await db.scalar(select(Campaign.id).where(Campaign.id == data.campaign_id))
+        if campaign_id is None:
+            raise CustomException(error_type=ExceptionType.CAMPAIGN_NOT_FOUND)
+        if user:
+            payment_link = await self._pending_payment_link(db, user.id, campaign_id)
+            if payment_link:
+                return payment_link
 
-        
+        # Lấy id trước: orderCode và code suy ra từ id nên không trùng nhau,
+        # và donation chỉ được ghi một lần, khi đã có link thanh toán
+        donation_id = await db.scalar(select(func.nextval(DONATION_ID_SEQUENCE)))
+        # Trả connection về pool trong lúc chờ PayOS
+        await db.commit()
+        code = f'TSSSbrm{campaign_id}brm{donation_id}'
+        payment_data = PaymentData(amount=100000, orderCode=donation_id, description=code, returnUrl=f"https://your-frontend.com/donation/success/{donation_id}",
+                                   cancelUrl=f"https://your-frontend.com/donation/failed/{donation_id}",
+                                   expiredAt=int(time.time()) + settings.DONATION_LINK_TTL_SECONDS)
 
-    async def create_donation(self, data: DonationReq, db: AsyncSession, user: User| None, payos_client: PayOS)-> dict:
-        campaign: Campaign | None = await db.get(Campaign, data.campaign_id)
-        if not campaign:
-            raise CustomException(error_type=ExceptionType.CAMPAIGN_NOT_FOUND)
-        code = f'TSSSbrm{campaign.id}brm{int(datetime.now().timestamp())}'
-        donation: Donation = Donation(
-            campaign_id=campaign.id,
+        try:
+            payment_link = (await payos_client.create_payment_link(payment_data)).to_json()
+        except CustomException:
+            # Circuit breaker đang mở: trả 503 ngay, không chờ PayOS
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        db.add(Donation(
+            id=donation_id,
+            campaign_id=campaign_id,
             code=code,
             message=data.message,
             user_id=user.id if user else None,
@@ -105,35 +153,40 @@ class DonationService(ITransactionService):
             bank_number='',
             bank_name='',
             amount=Decimal(0),  # Initialize amount to 0
-        )
-        db.add(donation)
+            payment_link_id=payment_link['paymentLinkId'],
+            payment_link=payment_link,
+        ))
         await db.commit()
-        await db.refresh(donation)
-        payment_data = PaymentData(amount=100000,orderCode=donation.id, description=code, returnUrl=f"https://your-frontend.com/donation/success/{donation.id}",
-                                   cancelUrl=f"https://your-frontend.com/donation/failed/{donation.id}")
-    
-        try:
-            payment_link_info = payos_client.createPaymentLink(paymentData=payment_data)
-            return payment_link_info
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return payment_link
 
-    async def get_all_donation(self, db: AsyncSession, user: User | None = None, params: PaginationParams = None):
-        query = select(Donation).options(
-        )
-        mapper = TransactionMapper.to_donation_response
+    def _donation_list_query(self, view: ListView):
+        """
+        view=summary chỉ đọc các cột của DonationSummaryResponse và đi fast path
+        của paginate(): Row -> DonationSummaryResponse, không qua ORM.
+        """
+        if view == ListView.SUMMARY:
+            return select(*DONATION_SUMMARY_COLUMNS), {'schema': DonationSummaryResponse}
+        return select(Donation), {'mapper': TransactionMapper.to_donation_response}
+
+    async def get_all_donation(self, db: AsyncSession, user: Principal | None = None, params: PaginationParams = None,
+                               view: ListView = ListView.FULL):
+        query, projection = self._donation_list_query(view)
         donations = await paginate(db=db, model=Donation,
-                                   query=query, params=params, mapper=mapper)
+                                   query=query, params=params, **projection)
         return donations
 
-    async def get_all_donation_by_campaign(self, campaign_id: int, params: PaginationParams, db: AsyncSession):
-        query = select(Donation).options(
-        ).filter(Donation.campaign_id == campaign_id)
-        mapper = TransactionMapper.to_donation_response
+    async def get_all_donation_by_campaign(self, campaign_id: int, params: PaginationParams, db: AsyncSession,
+                                           view: ListView = ListView.FULL):
+        query, projection = self._donation_list_query(view)
+        query = query.filter(Donation.campaign_id == campaign_id)
         donations = await paginate(db=db, model=Donation,
-                                   query=query,params=params,mapper=mapper)
+                                   query=query,params=params,**projection)
         return donations
     
+    def export_donations_by_campaign(self, campaign_id: int, fmt: ExportFormat) -> AsyncIterator[bytes]:
+        query = select(Donation).filter(Donation.campaign_id == campaign_id).order_by(Donation.id)
+        return stream_rows(query, TransactionMapper.to_donation_response, DonationResponse, fmt)
+
     # Withdrawal CRUD
     async def create_withdrawal(self,
                                 data: WithdrawalCreateReq,
@@ -165,7 +218,8 @@ class DonationService(ITransactionService):
             if has_quickly_withdrawal and data.type == 'quickly':
                 raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message='Bạn đã tạo giao dịch khẩn cấp trước đó rồi')
         if data.type == 'quickly':
-            if data.amount > campaign.current_amount*(Decimal(0.3)):
+            # current_total: đã gồm các shard chưa gộp
+            if data.amount > campaign.current_total*(Decimal(0.3)):
                 raise CustomException(error_type=ExceptionType.FAIL_TO_GET, custom_message='số tiền bạn muốn rút khẩn cấp vượt quá 30% số tiền đã đóng góp')
             else:
                 campaign.quickly_used = True
@@ -190,6 +244,10 @@ class DonationService(ITransactionService):
                                      query=query, params=params, mapper=TransactionMapper.to_withdrawal_response)
         return withdrawals
 
+    def export_withdrawals_by_campaign(self, campaign_id: int, fmt: ExportFormat) -> AsyncIterator[bytes]:
+        query = select(Withdrawal).filter(Withdrawal.campaign_id == campaign_id).order_by(Withdrawal.id)
+        return stream_rows(query, TransactionMapper.to_withdrawal_response, WithdrawalResponse, fmt)
+
     async def get_withdrawal_detail(self, withdrawal_id: int, db: AsyncSession) -> WithdrawalResponse:
         withdrawal: Withdrawal | None = await db.get(Withdrawal, withdrawal_id)
         if not withdrawal:
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+from decimal import Decimal
+from typing import List
+
+from payos.type import WebhookData
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.redis_client import close_redis_client, init_redis_client
+from app.db.base import AsyncSessionLocal, engine
+from app.helpers.cache import invalidate
+from app.helpers.exception_handler import CustomException
+from . import webhook_stream
+from .models import Donation, TransactionError
+from .services import DonationService
+from .webhook_stream import StreamMessage
+
+# Lâu lâu mới kiểm tra message bị treo, không phải sau mỗi batch
+CLAIM_INTERVAL_SECONDS = 5.0
+
+
+def _dead_letter(data: WebhookData, status: str) -> TransactionError:
+    return TransactionError(
+        bank_name=data.counterAccountName,
+        bank_number=data.counterAccountNumber,
+        amount=Decimal(data.amount),
+        content=data.description,
+        status=status,
+    )
+
+
+async def settle_batch(messages: List[StreamMessage], service: DonationService) -> None:
+    """
+    Ghi nhận một batch trong một transaction, mỗi message một savepoint:
+    - thành công hoặc đã ghi nhận từ trước: ACK
+    - lỗi nghiệp vụ (CustomException, ví dụ không tìm thấy donation): ghi
+      TransactionError 'pending' để đối soát tay, rồi ACK
+    - lỗi khác (DB, ...): không ACK, message được claim lại sau
+      WEBHOOK_CLAIM_IDLE_MS; quá WEBHOOK_MAX_DELIVERIES lần thì ghi
+      TransactionError 'dead_letter' rồi ACK
+    Chỉ ACK sau khi commit, nên một message có thể được xử lý lại; settle_payment
+    bỏ qua giao dịch đã có trong payment_ledger.
+    """
+    acked: List[str] = []
+    campaign_ids = set()
+    async with AsyncSessionLocal() as db:
+        # Một truy vấn cho cả batch; settle_payment lấy lại donation từ identity map
+        order_codes = [data.orderCode for _, data, _ in messages if data is not None]
+        donations = {donation.id: donation for donation in
+                     await db.scalars(select(Donation).where(Donation.id.in_(order_codes)))}
+
+        def campaign_order(message: StreamMessage) -> int:
+            # Cộng vào shard theo thứ tự campaign_id để các worker không deadlock nhau
+            donation = donations.get(message[1].orderCode) if message[1] is not None else None
+            return donation.campaign_id if donation else 0
+
+        for message_id, data, deliveries in sorted(messages, key=campaign_order):
+            if data is None:
+                acked.append(message_id)
+                continue
+            if deliveries > settings.WEBHOOK_MAX_DELIVERIES:
+                logging.error(f'Webhook {message_id} failed {deliveries - 1} times, dead-lettering')
+                db.add(_dead_letter(data, status='dead_letter'))
+                acked.append(message_id)
+                continue
+            try:
+                async with db.begin_nested():
+                    donation = await service.settle_payment(data, db)
+                if donation:
+                    campaign_ids.add(donation.campaign_id)
+                acked.append(message_id)
+            except CustomException as e:
+                logging.warning(f'Webhook {message_id} rejected: {e.message}')
+                db.add(_dead_letter(data, status='pending'))
+                acked.append(message_id)
+            except Exception as e:
+                logging.error(f'Webhook {message_id} failed, will retry: {e}')
+        await db.commit()
+
+    await webhook_stream.ack(acked)
+    if campaign_ids:
+        await invalidate(
+            'donations', 'campaigns',
+            *(f'donations:campaign:{campaign_id}' for campaign_id in campaign_ids),
+            *(f'campaign:{campaign_id}' for campaign_id in campaign_ids),
+        )
+
+
+async def run_settlement_worker(consumer: str) -> None:
+    """Một consumer của group: đọc batch mới, định kỳ nhận lại message bị treo."""
+    service = DonationService()
+    await webhook_stream.ensure_group()
+    loop = asyncio.get_running_loop()
+    next_claim = loop.time()
+    while True:
+        try:
+            messages = []
+            if loop.time() >= next_claim:
+                messages = await webhook_stream.claim_stale(consumer)
+                next_claim = loop.time() + CLAIM_INTERVAL_SECONDS
+            if not messages:
+                messages = await webhook_stream.read_new(consumer)
+            if messages:
+                await settle_batch(messages, service)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f'Settlement worker {consumer} error: {e}')
+            await asyncio.sleep(1.0)
+
+
+def consumer_names(count: int) -> List[str]:
+    base = f'{socket.gethostname()}-{os.getpid()}'
+    return [f'{base}-{i}' for i in range(count)]
+
+
+async def _main() -> None:
+    init_redis_client()
+    try:
+        await asyncio.gather(*(run_settlement_worker(name)
+                               for name in consumer_names(max(settings.WEBHOOK_WORKERS, 1))))
+    finally:
+        await webhook_stream.close_blocking_client()
+        await close_redis_client()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    # python -m app.features.transaction.settlement (đặt WEBHOOK_WORKERS=0 cho app)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
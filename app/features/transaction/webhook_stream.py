@@ -0,0 +1,119 @@
+import json
+from typing import List, Optional, Tuple
+
+import redis.asyncio as redis
+from payos.type import WebhookData
+from redis.exceptions import ResponseError
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+
+# Đánh dấu reference đã nhận, để webhook PayOS gửi lại không vào stream lần nữa
+SEEN_PREFIX = 'payos:seen:'
+
+# (message id, WebhookData đã xác thực, số lần đã giao cho consumer)
+StreamMessage = Tuple[str, WebhookData, int]
+
+# Client riêng cho XREADGROUP BLOCK, mỗi consumer giữ một kết nối
+_blocking_client: redis.Redis | None = None
+
+
+def _get_blocking_client() -> redis.Redis:
+    """
+    socket_timeout của client dùng chung (REDIS_SOCKET_TIMEOUT) không lớn hơn
+    WEBHOOK_BLOCK_MS, nên consumer rảnh bị timeout trước khi Redis trả về nil.
+    """
+    global _blocking_client
+    if _blocking_client is None:
+        _blocking_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.WEBHOOK_BLOCK_MS / 1000 + settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _blocking_client
+
+
+async def close_blocking_client() -> None:
+    global _blocking_client
+    if _blocking_client is not None:
+        await _blocking_client.aclose()
+        _blocking_client = None
+
+
+async def enqueue_webhook(data: WebhookData) -> Optional[str]:
+    """
+    XADD webhook đã xác thực vào stream, trả về message id. Cần bật AOF để stream bền khi Redis restart.
+    Trả về None nếu reference này đã được nhận trong WEBHOOK_DEDUP_TTL giây
+    (payment_ledger vẫn là chốt chặn cuối cùng khi key đã hết hạn).
+    """
+    redis_client = get_redis_client()
+    seen_key = f'{SEEN_PREFIX}{data.reference}'
+    if not await redis_client.set(seen_key, 1, nx=True, ex=settings.WEBHOOK_DEDUP_TTL):
+        return None
+    try:
+        return await redis_client.xadd(
+            settings.WEBHOOK_STREAM,
+            {'data': json.dumps(data.to_json())},
+            maxlen=settings.WEBHOOK_STREAM_MAXLEN,
+            approximate=True,
+        )
+    except Exception:
+        # Chưa vào stream thì để lần PayOS gửi lại được nhận
+        await redis_client.delete(seen_key)
+        raise
+
+
+async def ensure_group() -> None:
+    try:
+        await get_redis_client().xgroup_create(
+            settings.WEBHOOK_STREAM, settings.WEBHOOK_CONSUMER_GROUP, id='0', mkstream=True
+        )
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _decode(entries, deliveries: dict = None) -> List[StreamMessage]:
+    messages = []
+    for message_id, fields in entries:
+        # Entry đã bị trim khỏi stream nhưng còn trong PEL
+        data = WebhookData(**json.loads(fields['data'])) if fields else None
+        messages.append((message_id, data, (deliveries or {}).get(message_id, 1)))
+    return messages
+
+
+async def read_new(consumer: str) -> List[StreamMessage]:
+    response = await _get_blocking_client().xreadgroup(
+        settings.WEBHOOK_CONSUMER_GROUP, consumer, {settings.WEBHOOK_STREAM: '>'},
+        count=settings.WEBHOOK_BATCH_SIZE, block=settings.WEBHOOK_BLOCK_MS,
+    )
+    return _decode(response[0][1]) if response else []
+
+
+async def claim_stale(consumer: str) -> List[StreamMessage]:
+    """
+    Nhận lại các message đã giao cho consumer khác mà chưa ACK sau
+    WEBHOOK_CLAIM_IDLE_MS (consumer chết, hoặc lần xử lý trước lỗi).
+    Dùng XPENDING + XCLAIM thay vì XAUTOCLAIM để biết số lần đã giao.
+    """
+    redis_client = get_redis_client()
+    pending = await redis_client.xpending_range(
+        settings.WEBHOOK_STREAM, settings.WEBHOOK_CONSUMER_GROUP, min='-', max='+',
+        count=settings.WEBHOOK_BATCH_SIZE, idle=settings.WEBHOOK_CLAIM_IDLE_MS,
+    )
+    if not pending:
+        return []
+    # XCLAIM tăng số lần giao thêm 1
+    deliveries = {p['message_id']: p['times_delivered'] + 1 for p in pending}
+    claimed = await redis_client.xclaim(
+        settings.WEBHOOK_STREAM, settings.WEBHOOK_CONSUMER_GROUP, consumer,
+        min_idle_time=settings.WEBHOOK_CLAIM_IDLE_MS, message_ids=list(deliveries),
+    )
+    # Message đã bị consumer khác claim trước sẽ không có trong kết quả
+    return _decode(claimed, deliveries)
+
+
+async def ack(message_ids: List[str]) -> None:
+    if message_ids:
+        await get_redis_client().xack(settings.WEBHOOK_STREAM, settings.WEBHOOK_CONSUMER_GROUP, *message_ids)
@@ -1,16 +1,15 @@
 from fastapi import APIRouter, Depends, Path
 from typing import Any
 from sqlalchemy.ext.asyncio import AsyncSession  # ✅ Thêm import
-import json
-import redis
-from app.core.redis_client import get_redis_client
+from app.helpers.cache import RouteCache, cached_route, invalidate
 from app.db.base import get_db  # ✅ Thêm import
 from app.helpers.bases import DataResponse
 from .schemas import UserCreateReq, UserResponse, UpdateUserReq
 from .services import UserService
 from .models import User
-from app.helpers.deps import get_current_user, get_current_user_id
-from app.helpers.paging import Page, PaginationParams
+from app.features.auth.schemas import Principal
+from app.helpers.deps import get_current_user, get_current_principal
+from app.helpers.paging import Page, PaginationParams, pagination_params
 from app.helpers.login_manager import permission_required
 import logging
 
@@ -35,18 +34,13 @@ async def register(register_data: UserCreateReq,
 
 @router.get('', response_model=DataResponse[UserResponse])
 async def get_current_info(
-        user: User = Depends(get_current_user),
+        user: Principal = Depends(get_current_principal),
         user_service: UserService = Depends(get_user_service),
-        redis_client: redis.Redis = Depends(get_redis_client),
+        cache: RouteCache = Depends(cached_route('user:{user_id}', namespaces=['user:{user_id}'])),
         db: AsyncSession = Depends(get_db)
 ):
-    cache_key = f"user:{user.id}"
-    cached_user = redis_client.get(cache_key)
-    if cached_user:
-        return DataResponse(data=UserResponse.model_validate(json.loads(cached_user)))
-    response = await user_service.get_my_profile(db=db, user=user)
-    redis_client.set(cache_key, response.model_dump_json(), ex=600)
-    return DataResponse(data=response)
+    return await cache.fetch(lambda: user_service.get_my_profile(db=db, user=user),
+                             envelope=True, user_id=user.id)
 
 
 @router.put('', response_model=DataResponse[UserResponse])
@@ -54,12 +48,10 @@ async def get_current_info(
 async def update_me(update_data: UpdateUserReq,
                     user: User = Depends(get_current_user),
                     db: AsyncSession = Depends(get_db),
-                    user_service: UserService = Depends(get_user_service),
-                    redis_client: redis.Redis = Depends(get_redis_client)
+                    user_service: UserService = Depends(get_user_service)
                     ):
-    cache_key = f"user:{user.id}"
-    redis_client.delete(cache_key)
     user_updated = await user_service.update_me(db=db, user=user, data=update_data)
+    await invalidate(f'user:{user_updated.id}', 'users')
     return DataResponse(data=user_updated)
 
 
@@ -68,27 +60,29 @@ async def update_me(update_data: UpdateUserReq,
 async def update(data: UpdateUserReq,
                  user_id: int = Path(),
                  db: AsyncSession = Depends(get_db),
-                 user_service: UserService = Depends(get_user_service),
-                 redis_client: redis.Redis = Depends(get_redis_client)
+                 user_service: UserService = Depends(get_user_service)
                  ):
-    cache_key = f"user:{user_id}"
-    redis_client.delete(cache_key)
-    user_updated = await user_service.update(db=db, id=user_id, data=data)
+    user_updated = await user_service.update(db=db, user_id=user_id, data=data)
+    await invalidate(f'user:{user_id}', 'users')
     return DataResponse(data=user_updated)
 
 
+@router.patch('/ban/{user_id}', response_model=DataResponse[UserResponse])
+async def ban(user_id: int = Path(),
+              db: AsyncSession = Depends(get_db),
+              current_admin: Principal = Depends(require_admin_role),
+              user_service: UserService = Depends(get_user_service)
+              ):
+    user_banned = await user_service.ban(db=db, user_id=user_id)
+    await invalidate(f'user:{user_id}', 'users')
+    return DataResponse(data=user_banned)
+
+
 @router.get('/all', response_model=Page[UserResponse])
-async def get_all(params: PaginationParams = Depends(),
+async def get_all(params: PaginationParams = Depends(pagination_params('id')),
                   db: AsyncSession = Depends(get_db),
-                  current_admin: User = Depends(require_admin_role),
+                  current_admin: Principal = Depends(require_admin_role),
                   user_service: UserService = Depends(get_user_service),
-                  redis_client: redis.Redis = Depends(get_redis_client)
+                  cache: RouteCache = Depends(cached_route('users', namespaces=['users']))
                   ) -> Any:
-    cache_key = f"users:page_{params.page}:size_{params.page_size}"
-    cached_users = redis_client.get(cache_key)
-    if cached_users:
-        return Page[UserResponse].model_validate(json.loads(cached_users))
-
-    users_page = await user_service.get_all_user(db=db, params=params)
-    redis_client.set(cache_key, users_page.model_dump_json(), ex=600)
-    return users_page
+    return await cache.fetch(lambda: user_service.get_all_user(db=db, params=params))
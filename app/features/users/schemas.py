@@ -41,6 +41,7 @@ class TokenPayload(BaseModel):
     sub: Optional[int] = None
     type: Optional[str] = None
     jti: Optional[str] = None
+    exp: Optional[int] = None
 
 
 class UpdateUserReq(UserBase):
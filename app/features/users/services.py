@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession  # Quan trọng
 
 from .models import User, UserProfile
 from sqlalchemy.orm import selectinload, joinedload
-from app.core.security import verify_password, get_password_hash
+from app.core.security import password_hasher
 from .schemas import UserCreateReq, UserResponse, UpdateUserReq
 from .mappers import UserMapper
 from app.helpers.paging import (
@@ -13,6 +13,9 @@ from app.helpers.paging import (
     Page,
 )  # Giả sử paginate đã được sửa
 from app.helpers.exception_handler import CustomException, ExceptionType
+from app.helpers.enums import UserStatus
+from app.features.auth.principal import invalidate_principal
+from app.features.auth.schemas import Principal
 
 
 class UserService:
@@ -33,7 +36,7 @@ class UserService:
         profile = UserProfile(email=data.email)
         new_user = User(
             email=data.email,
-            hash_password=get_password_hash(data.password),
+            hash_password=await password_hasher.hash(data.password),
             is_active=data.is_active,
             user_profile=profile,
             role=data.role,
@@ -51,7 +54,7 @@ class UserService:
         logging.info(loaded_user.user_profile.id)
         return UserMapper.to_user_response(loaded_user)
 
-    async def get_my_profile(self, db: AsyncSession, user: User) -> UserResponse:
+    async def get_my_profile(self, db: AsyncSession, user: User | Principal) -> UserResponse:
         query = (
             select(User)
             .options(selectinload(User.user_profile))
@@ -74,6 +77,7 @@ class UserService:
         )
         await db.commit()
         await db.refresh(user)
+        await invalidate_principal(user.id)
         return UserMapper.to_user_response(user)
 
     async def update(
@@ -89,8 +93,20 @@ class UserService:
 
         await db.commit()
         await db.refresh(user)
+        await invalidate_principal(user.id)
         return UserMapper.to_user_response(user)
 
+    async def ban(self, db: AsyncSession, user_id: int) -> UserResponse:
+        user = await db.get(User, user_id)
+        if not user:
+            raise CustomException(error_type=ExceptionType.USER_NOT_EXITS)
+
+        user.status = UserStatus.BANNED.value
+        await db.commit()
+        # Token đang dùng phải thấy trạng thái mới ngay ở request kế tiếp
+        await invalidate_principal(user.id)
+        return await self.get_my_profile(db=db, user=user)
+
     async def get_all_user(self, db: AsyncSession, params: PaginationParams):
         # 1. Tạo câu lệnh select()
         _query = select(User).options(joinedload(User.user_profile))
@@ -101,7 +117,8 @@ class UserService:
 
         # 2. Gọi hàm paginate bất đồng bộ với await
         users = await paginate(
-            db=db, model=User, query=_query, params=params, mapper=mapper
+            db=db, model=User, query=_query, params=params, mapper=mapper,
+            estimate_total=True
         )
 
         return users
@@ -58,4 +58,8 @@ class DataResponse(ResponseSchemaBase, Generic[T]):
 class MetadataSchema(BaseModel):
     current_page: int
     page_size: int
-    total_items: int
+    # None khi client gửi with_total=false
+    total_items: Optional[int] = None
+    # Chỉ có khi phân trang theo cursor (keyset)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
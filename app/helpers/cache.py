@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple, Union
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.core import redis_pubsub
+from app.core.config import settings
+from app.core.redis_client import get_redis_bytes_client, get_redis_client
+from app.helpers.bases import DataResponse
+from app.helpers.exception_handler import CustomException, ExceptionType
+
+NAMESPACE_PREFIX = 'ns:'
+INVALIDATION_CHANNEL = 'cache:invalidate'
+FRESH_SUFFIX = ':fresh'
+LOCK_SUFFIX = ':lock'
+# Giá trị đánh dấu "không tìm thấy" (negative cache), kèm tên ExceptionType
+NEGATIVE_PREFIX = b'!miss:'
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LocalCache:
+    """
+    Cache LRU trong bộ nhớ của worker (L1), giới hạn theo tổng số byte của value,
+    mỗi entry sống tối đa `ttl` giây.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        # key -> (value, expires_at)
+        self._entries: 'OrderedDict[str, Tuple[Union[str, bytes], float]]' = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def _weight(key: str, value: Union[str, bytes]) -> int:
+        return len(key) + len(value)
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Union[str, bytes]) -> None:
+        weight = self._weight(key, value)
+        if weight > self._max_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = (value, time.monotonic() + self._ttl)
+        self._size += weight
+        while self._size > self._max_bytes:
+            self.discard(next(iter(self._entries)))
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= self._weight(key, entry[0])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+
+class ReadThroughCache:
+    """
+    Read-through cache trên Redis, chống cache stampede:
+    - Trong một worker: các request trùng key dùng chung một lần load.
+    - Giữa các worker: chỉ ai giữ lock `<key>:lock` mới load lại, số còn lại
+      trả về bản cũ (stale) nếu có, hoặc chờ bản mới.
+    Mỗi key có thêm marker `<key>:fresh`; value sống lâu hơn marker
+    CACHE_STALE_TTL giây để có bản cũ mà trả về trong lúc đang load lại.
+    Trước Redis (L2) là LocalCache (L1) của worker với TTL ngắn.
+    """
+
+    def __init__(self, local: LocalCache, jitter: float, stale_ttl: int,
+                 lock_ttl_ms: int, wait_timeout: float):
+        self._local = local
+        self._jitter = jitter
+        self._stale_ttl = stale_ttl
+        self._lock_ttl_ms = lock_ttl_ms
+        self._wait_timeout = wait_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _jittered(self, ttl: int) -> int:
+        return max(1, round(ttl * random.uniform(1 - self._jitter, 1 + self._jitter)))
+
+    async def get_or_load(self, key: str,
+                          loader: Callable[[], Awaitable[Tuple[bytes, int]]]) -> bytes:
+        """loader trả về (payload, ttl); payload là bytes, trả thẳng cho client."""
+        value = self._local.get(key)
+        if value is not None:
+            return value
+        value, fresh = await get_redis_bytes_client().mget(key, key + FRESH_SUFFIX)
+        if value is not None and fresh is not None:
+            self._local.put(key, value)
+            return value
+
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # Request dẫn đầu bị huỷ (client ngắt kết nối), không phải request này:
+                # chờ request dẫn đầu mới hoặc tự load
+
+        future = asyncio.get_running_loop().create_future()
+        # Tránh warning "exception was never retrieved" khi không ai chờ
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            payload = await self._load(key, stale=value, loader=loader)
+            self._local.put(key, payload)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, key: str, stale: Optional[bytes],
+                    loader: Callable[[], Awaitable[Tuple[bytes, int]]]) -> bytes:
+        redis_client = get_redis_bytes_client()
+        lock_key = key + LOCK_SUFFIX
+        token = uuid.uuid4().hex
+        acquired = await redis_client.set(lock_key, token, nx=True, px=self._lock_ttl_ms)
+        if not acquired:
+            if stale is not None:
+                return stale
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._wait_timeout
+            while loop.time() < deadline:
+                await asyncio.sleep(0.05)
+                value = await redis_client.get(key)
+                if value is not None:
+                    return value
+            logging.warning(f'Timed out waiting for cache fill of {key}, loading directly')
+
+        try:
+            payload, ttl = await loader()
+            ttl = self._jittered(ttl)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, payload, ex=ttl + self._stale_ttl)
+                pipe.set(key + FRESH_SUFFIX, 1, ex=ttl)
+                await pipe.execute()
+            return payload
+        finally:
+            if acquired:
+                await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+
+read_through_cache = ReadThroughCache(
+    local=LocalCache(max_bytes=settings.CACHE_LOCAL_MAX_BYTES, ttl=settings.CACHE_LOCAL_TTL),
+    jitter=settings.CACHE_TTL_JITTER,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    lock_ttl_ms=settings.CACHE_LOCK_TTL_MS,
+    wait_timeout=settings.CACHE_WAIT_TIMEOUT
+)
+
+
+class GenerationStore:
+    """
+    Số thế hệ của các namespace, nằm trên Redis và được nhớ tạm trong worker.
+    Khi một worker invalidate, các worker khác nhận tin qua pub/sub và bỏ bản
+    nhớ tạm, nên entry L1 gắn với generation cũ không còn được đọc tới nữa.
+    """
+
+    def __init__(self, local: LocalCache):
+        self._local = local
+        # Tăng mỗi khi nhận invalidation, để bỏ kết quả MGET đọc trước đó
+        self._epoch = 0
+
+    def _forget(self, namespaces: Sequence[str]) -> None:
+        self._epoch += 1
+        for namespace in namespaces:
+            self._local.discard(namespace)
+
+    def _on_message(self, message: str) -> None:
+        self._forget(json.loads(message))
+
+    def _on_resubscribe(self) -> None:
+        # Có thể đã lỡ tin invalidate trong lúc mất kết nối: bỏ hết generation nhớ tạm
+        self._epoch += 1
+        self._local.clear()
+
+    async def get(self, namespaces: Sequence[str]) -> str:
+        values = [self._local.get(ns) for ns in namespaces]
+        missing = [ns for ns, value in zip(namespaces, values) if value is None]
+        if missing:
+            epoch = self._epoch
+            fetched = await get_redis_client().mget([NAMESPACE_PREFIX + ns for ns in missing])
+            fetched = dict(zip(missing, (value or '0' for value in fetched)))
+            if epoch == self._epoch:
+                for namespace, value in fetched.items():
+                    self._local.put(namespace, value)
+            values = [value if value is not None else fetched[ns]
+                      for ns, value in zip(namespaces, values)]
+        return '.'.join(values)
+
+    async def bump(self, namespaces: Sequence[str]) -> None:
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(NAMESPACE_PREFIX + namespace)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps(list(namespaces)))
+            await pipe.execute()
+        self._forget(namespaces)
+
+
+generations = GenerationStore(
+    local=LocalCache(max_bytes=settings.CACHE_LOCAL_MAX_BYTES // 32, ttl=settings.CACHE_LOCAL_TTL)
+)
+redis_pubsub.subscribe(INVALIDATION_CHANNEL, generations._on_message)
+redis_pubsub.on_resubscribe(generations._on_resubscribe)
+
+
+async def invalidate(*namespaces: str) -> None:
+    """
+    Vô hiệu hoá mọi key thuộc các namespace bằng cách tăng số thế hệ (generation)
+    của chúng: một lệnh INCR thay vì quét keyspace. Key cũ không còn ai đọc tới
+    và tự hết hạn theo TTL; mọi worker được báo qua pub/sub để bỏ bản L1.
+    """
+    if namespaces:
+        await generations.bump(namespaces)
+
+
+class RouteCache:
+    """
+    Cache cho một request cụ thể, được tạo bởi dependency cached_route().
+    Response được lưu dưới dạng JSON bytes: cache hit trả thẳng bytes, không
+    parse/validate/serialize lại; cache miss chỉ serialize đúng một lần.
+    """
+
+    def __init__(self, key_template: str, namespaces: Sequence[str], path_params: dict,
+                 query: str, ttl: int, negative_on: Iterable[ExceptionType], negative_ttl: int):
+        self._key_template = key_template
+        self._namespaces = namespaces
+        self._path_params = path_params
+        self._query = query
+        self._ttl = ttl
+        self._negative_on = {error_type.code for error_type in negative_on}
+        self._negative_ttl = negative_ttl
+
+    async def key(self, **vary) -> str:
+        values = {**self._path_params, **vary}
+        base = self._key_template.format_map(values)
+        generation = await generations.get([ns.format_map(values) for ns in self._namespaces])
+        key = f'{base}:g{generation}'
+        return f'{key}:{self._query}' if self._query else key
+
+    async def fetch(self, loader: Callable[[], Awaitable[BaseModel]],
+                    envelope: bool = False, **vary) -> Response:
+        """
+        Lấy response từ cache, hoặc gọi loader (thường là service) rồi lưu lại.
+        `envelope=True` bọc kết quả trong DataResponse trước khi lưu.
+        `vary` bổ sung các phần của key không nằm trên URL (ví dụ id của user).
+        """
+        async def load() -> Tuple[bytes, int]:
+            try:
+                result = await loader()
+            except CustomException as e:
+                if e.code not in self._negative_on:
+                    raise
+                return NEGATIVE_PREFIX + e.code.encode(), self._negative_ttl
+            if envelope:
+                result = DataResponse(data=result)
+            return to_json(result), self._ttl
+
+        payload = await read_through_cache.get_or_load(await self.key(**vary), load)
+        if payload.startswith(NEGATIVE_PREFIX):
+            code = payload[len(NEGATIVE_PREFIX):].decode()
+            raise CustomException(error_type=next(t for t in ExceptionType if t.code == code))
+        return Response(content=payload, media_type='application/json')
+
+
+def cached_route(key_template: str,
+                 namespaces: Iterable[str] = (),
+                 ttl: int = settings.CACHE_DEFAULT_TTL,
+                 negative_on: Iterable[ExceptionType] = (),
+                 negative_ttl: int = settings.CACHE_NEGATIVE_TTL):
+    """
+    Dependency factory. Key = key_template (format với path params và `vary`)
+    + generation của các namespace + query string đã sắp xếp,
+    ví dụ `campaigns:all:g3:page=2&page_size=10`.
+    `namespaces` cũng là template; invalidate(namespace) làm mất hiệu lực key.
+    """
+    namespaces = tuple(namespaces)
+    negative_on = tuple(negative_on)
+
+    async def dependency(request: Request) -> RouteCache:
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return RouteCache(key_template, namespaces, dict(request.path_params), query,
+                          ttl=ttl, negative_on=negative_on, negative_ttl=negative_ttl)
+
+    return dependency
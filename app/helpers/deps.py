@@ -1,13 +1,18 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
 import jwt
 from pydantic import ValidationError
 from app.core.config import settings
-from typing import Optional
-from app.db.base import get_db
-from sqlalchemy import select
+from typing import AsyncGenerator, Optional
+from app.db.base import AsyncSessionLocal, get_db, replicas
+from app.db.replicas import is_primary_sticky
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import raiseload
+from app.db.statements import hot_statement
 from ..features.users.models import User
-from ..features.auth.models import InvalidateToken
+from ..features.auth.revocation import revocation_store
+from ..features.auth.principal import principal_cache, load_principal
+from ..features.auth.schemas import Principal
 from ..features.users.schemas import TokenPayload
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from ..helpers.exception_handler import CustomException, ExceptionType
@@ -17,97 +22,145 @@ import logging
 reusable_oauth2 = HTTPBearer(scheme_name='Authorization')
 optional_bearer = HTTPBearer(auto_error=False)
 
-async def get_current_user_optional(db: AsyncSession = Depends(get_db),
-                           http_authorization_credentials=Depends(optional_bearer)) -> Optional[User]:
-    if http_authorization_credentials:
-        return await get_current_user(db, http_authorization_credentials)
-    return None
 
-async def get_current_user(db: AsyncSession = Depends(get_db),
-                           http_authorization_credentials=Depends(reusable_oauth2)) -> User:
+async def verify_access_token(token: str) -> TokenPayload:
     """
-    Decode JWT token to get user_id => return User info from DB query
+    Decode access token và kiểm tra JTI chưa bị thu hồi (không chạm tới DB)
     """
-    logging.warning('token')
     try:
         payload = jwt.decode(
-            http_authorization_credentials.credentials, settings.SECRET_KEY,
+            token, settings.SECRET_KEY,
             algorithms=[settings.SECURITY_ALGORITHM]
         )
-        token_data = TokenPayload(sub=payload.get('sub'), jti=payload.get('jti'), type=payload.get('type'))
+        token_data = TokenPayload(sub=payload.get('sub'), jti=payload.get('jti'),
+                                  type=payload.get('type'), exp=payload.get('exp'))
         if token_data.type == 'refresh':
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail='user is not authenticated'
 
             )
-        token_jti = token_data.jti
-        logging.info(token_jti)
-        if not token_jti:
+        if not token_data.jti:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail='could not get jti'
             )
-        query_is_valid = select(InvalidateToken).filter(InvalidateToken.jti == token_data.jti)
-        result = await db.execute(query_is_valid)
-        is_valid = result.scalars().first()
-        logging.info(is_valid)
-        if is_valid:
+        if await revocation_store.is_revoked(token_data.jti):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail='user is not authenticated'
             )
-        int_token = int(token_data.sub)
-    except (jwt.PyJWTError, ValidationError):
+        int(token_data.sub)
+    except (jwt.PyJWTError, ValidationError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Could not validate credentials",
         )
-    user = await db.get(User, int(token_data.sub))
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    return token_data
 
-    return user
-async def get_current_user_id(db: AsyncSession = Depends(get_db),
-                           http_authorization_credentials=Depends(reusable_oauth2)) -> int:
+
+async def get_current_principal(request: Request, db: AsyncSession = Depends(get_db),
+                                http_authorization_credentials=Depends(reusable_oauth2)) -> Principal:
     """
-    Decode JWT token to get user_id => return User info from DB query
+    Trả về principal (id, role, status) của token. Cache hit không cần jwt.decode
+    lẫn truy vấn DB, chỉ kiểm tra lại JTI trên Bloom filter.
     """
-    logging.warning('token')
-    try:
-        payload = jwt.decode(
-            http_authorization_credentials.credentials, settings.SECRET_KEY,
-            algorithms=[settings.SECURITY_ALGORITHM]
-        )
-        token_data = TokenPayload(sub=payload.get('sub'), jti=payload.get('jti'), type=payload.get('type'))
-        if token_data.type == 'refresh':
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='user is not authenticated'
+    principal = await _resolve_principal(db, http_authorization_credentials)
+    # get_db dùng để bật sticky primary sau khi user này ghi
+    request.state.principal_id = principal.id
+    return principal
 
-            )
-        token_jti = token_data.jti
-        logging.info(token_jti)
-        if not token_jti:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='could not get jti'
-            )
-        query_is_valid = select(InvalidateToken).filter(InvalidateToken.jti == token_data.jti)
-        result = await db.execute(query_is_valid)
-        is_valid = result.scalars().first()
-        logging.info(is_valid)
-        if is_valid:
+
+async def _resolve_principal(db: AsyncSession, http_authorization_credentials) -> Principal:
+    token = http_authorization_credentials.credentials
+    digest = principal_cache.digest(token)
+    cached = principal_cache.get(digest)
+    if cached:
+        principal, jti = cached
+        if await revocation_store.is_revoked(jti):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail='user is not authenticated'
             )
-        int_token = int(token_data.sub)
-    except (jwt.PyJWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Could not validate credentials",
-        )
-    return int(token_data.sub)
+        return principal
+
+    token_data = await verify_access_token(token)
+    principal = await load_principal(db, int(token_data.sub))
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.put(digest, principal, jti=token_data.jti, exp=token_data.exp)
+    return principal
 
 
+async def get_current_principal_optional(request: Request, db: AsyncSession = Depends(get_db),
+                                         http_authorization_credentials=Depends(optional_bearer)) -> Optional[Principal]:
+    if http_authorization_credentials:
+        return await get_current_principal(request, db, http_authorization_credentials)
+    return None
+
+
+def _token_user_id(http_authorization_credentials) -> Optional[int]:
+    """
+    id của user trong bearer token, chỉ để chọn primary/replica: token thiếu,
+    sai hay hết hạn thì trả về None thay vì báo lỗi như dependency xác thực.
+    """
+    if not http_authorization_credentials:
+        return None
+    token = http_authorization_credentials.credentials
+    cached = principal_cache.get(principal_cache.digest(token))
+    if cached:
+        return cached[0].id
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.SECURITY_ALGORITHM])
+        return int(payload['sub'])
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def get_read_db(http_authorization_credentials=Depends(optional_bearer)
+                      ) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session chỉ đọc trên một read replica (round-robin). Dùng primary khi không
+    có replica nào khoẻ, hoặc khi user vừa ghi (sticky primary) để đọc được
+    ngay dữ liệu của chính mình.
+    """
+    sessionmaker = replicas.pick()
+    if sessionmaker is not None:
+        user_id = _token_user_id(http_authorization_credentials)
+        if user_id is not None and await is_primary_sticky(user_id):
+            sessionmaker = None
+    async with (sessionmaker or AsyncSessionLocal)() as session:
+        yield session
+
+
+async def get_current_user_optional(request: Request, db: AsyncSession = Depends(get_db),
+                           http_authorization_credentials=Depends(optional_bearer)) -> Optional[User]:
+    if http_authorization_credentials:
+        return await get_current_user(request, db, http_authorization_credentials)
+    return None
+
+@hot_statement(user_id=0)
+def _user_query(user_id: int):
+    return lambda_stmt(lambda: select(User).options(raiseload(User.campaign)).where(User.id == user_id))
+
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db),
+                           http_authorization_credentials=Depends(reusable_oauth2)) -> User:
+    """
+    Decode JWT token to get user_id => return User info from DB query.
+    Chỉ dùng cho route cần sửa User; route chỉ cần id/role nên dùng get_current_principal.
+    """
+    principal = await get_current_principal(request, db, http_authorization_credentials)
+    # Session mới cho mỗi request nên db.get() không có lợi thế identity map
+    user = (await db.execute(_user_query(principal.id))).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return user
+async def get_current_user_id(request: Request, db: AsyncSession = Depends(get_db),
+                              http_authorization_credentials=Depends(reusable_oauth2)) -> int:
+    """
+    Decode JWT token to get user_id
+    """
+    principal = await get_current_principal(request, db, http_authorization_credentials)
+    return principal.id
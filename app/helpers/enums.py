@@ -27,3 +27,13 @@ class WithdrawalStatus(enum.Enum):
     WAITING = 'waiting'
     PROVEN = 'proven'
 
+
+class ListView(enum.Enum):
+    SUMMARY = 'summary'
+    FULL = 'full'
+
+
+class ExportFormat(enum.Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
@@ -17,6 +17,11 @@ class ExceptionType(enum.Enum):
     FAIL_TO_GET = 400, '1005', 'Lấy dữ liệu thất bại'
     USER_BANNED = 400, '1006', 'người dùng đã bị đình chỉ'
     CAMPAIGN_NOT_FOUND = 404, '1007', 'không tìm chiến dịch'
+    INVALID_CURSOR = 400, '1008', 'Cursor phân trang không hợp lệ'
+    INVALID_SORT = 400, '1009', 'Tham số sắp xếp không hợp lệ'
+    PAYMENT_UNAVAILABLE = 503, '1010', 'Cổng thanh toán đang gián đoạn, vui lòng thử lại sau'
+    IDEMPOTENCY_IN_PROGRESS = 409, '1011', 'Yêu cầu với Idempotency-Key này đang được xử lý'
+    IDEMPOTENCY_KEY_REUSED = 422, '1012', 'Idempotency-Key đã được dùng cho một yêu cầu khác'
 
     def __new__(cls, *args, **kwds):
         value = len(cls.__members__) + 1
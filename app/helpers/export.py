@@ -0,0 +1,59 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy.sql.selectable import Select
+
+from app.core.config import settings
+from app.db.base import AsyncSessionLocal, replicas
+from app.helpers.enums import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+def _encode_ndjson(items: list[BaseModel]) -> bytes:
+    return b''.join(to_json(item) + b'\n' for item in items)
+
+
+def _encode_csv(items: list[BaseModel], fields: list[str]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    for item in items:
+        writer.writerow(item.model_dump(mode='json'))
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(query: Select, mapper: Callable[..., BaseModel], schema: Type[BaseModel],
+                      fmt: ExportFormat, batch_size: int = settings.EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Đọc query bằng server-side cursor, mỗi lần `batch_size` dòng, và trả về
+    từng chunk đã encode, nên bộ nhớ không phụ thuộc vào số dòng.
+    Session riêng vì session của get_db() đã đóng trước khi response được stream;
+    đọc từ read replica nếu có.
+    """
+    fields = list(schema.model_fields)
+    if fmt == ExportFormat.CSV:
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=fields).writeheader()
+        yield buffer.getvalue().encode()
+
+    async with (replicas.pick() or AsyncSessionLocal)() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            items = [mapper(row) for row in partition]
+            # identity map chỉ giữ weakref nên các object của batch trước được giải phóng
+            yield _encode_csv(items, fields) if fmt == ExportFormat.CSV else _encode_ndjson(items)
+
+
+def export_response(rows: AsyncIterator[bytes], fmt: ExportFormat, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        rows,
+        media_type=MEDIA_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt.value}"'}
+    )
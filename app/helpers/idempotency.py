@@ -0,0 +1,88 @@
+import hashlib
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Header, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.helpers.bases import DataResponse
+from app.helpers.exception_handler import CustomException, ExceptionType
+
+IDEMPOTENCY_PREFIX = 'idem:'
+
+# Chỉ xoá record "đang xử lý" nếu vẫn là của request này
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotentRequest:
+    """
+    Một request POST kèm header Idempotency-Key, được tạo bởi dependency idempotent().
+    Redis giữ, theo key:
+    - khi đang xử lý: {'fingerprint', 'token'}, hết hạn sau IDEMPOTENCY_LOCK_TTL
+    - khi xong: {'fingerprint', 'response'}, giữ IDEMPOTENCY_TTL giây
+    Client gửi lại cùng key nhận đúng response cũ mà không chạy lại handler.
+    """
+
+    def __init__(self, scope: str, key: Optional[str]):
+        self._scope = scope
+        self._key = key
+
+    async def run(self, handler: Callable[[], Awaitable[Any]], body: BaseModel,
+                  owner: Any = None) -> Response:
+        """
+        Chạy handler (kết quả được bọc trong DataResponse) nếu key chưa được dùng.
+        `body` là request body: cùng key mà khác body thì bị từ chối.
+        `owner` (thường là id của user) tách không gian key giữa các client.
+        """
+        if self._key is None:
+            return Response(content=to_json(DataResponse(data=await handler())), media_type='application/json')
+
+        redis_client = get_redis_client()
+        redis_key = f'{IDEMPOTENCY_PREFIX}{self._scope}:{owner or "anon"}:{self._key}'
+        fingerprint = hashlib.sha256(to_json(body)).hexdigest()
+        in_progress = json.dumps({'fingerprint': fingerprint, 'token': uuid.uuid4().hex})
+
+        if not await redis_client.set(redis_key, in_progress, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+            record = await redis_client.get(redis_key)
+            if record is None:
+                # Request trước vừa lỗi và xoá key
+                raise CustomException(error_type=ExceptionType.IDEMPOTENCY_IN_PROGRESS)
+            record = json.loads(record)
+            if record['fingerprint'] != fingerprint:
+                raise CustomException(error_type=ExceptionType.IDEMPOTENCY_KEY_REUSED)
+            if 'response' not in record:
+                raise CustomException(error_type=ExceptionType.IDEMPOTENCY_IN_PROGRESS)
+            return Response(content=record['response'], media_type='application/json')
+
+        try:
+            payload = to_json(DataResponse(data=await handler()))
+        except BaseException:
+            # Lỗi thì không lưu gì, client gửi lại cùng key được xử lý lại
+            await redis_client.eval(_RELEASE_SCRIPT, 1, redis_key, in_progress)
+            raise
+        await redis_client.set(
+            redis_key,
+            json.dumps({'fingerprint': fingerprint, 'response': payload.decode()}),
+            ex=settings.IDEMPOTENCY_TTL,
+        )
+        return Response(content=payload, media_type='application/json')
+
+
+def idempotent(scope: str):
+    """Dependency factory; header Idempotency-Key không bắt buộc."""
+
+    async def dependency(
+        idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=255),
+    ) -> IdempotentRequest:
+        return IdempotentRequest(scope, idempotency_key)
+
+    return dependency
@@ -1,11 +1,11 @@
 from fastapi import Depends, HTTPException, status
-from app.features.users.models import User
-# Giả sử get_current_user đã được định nghĩa là async
-from .deps import get_current_user
+from app.features.auth.schemas import Principal
+# Phân quyền dựa trên principal đã cache, không cần load User từ session
+from .deps import get_current_principal
 
 
 def permission_required(*required_roles: str):
-    async def check_permissions(current_user: User = Depends(get_current_user)) -> User:
+    async def check_permissions(current_user: Principal = Depends(get_current_principal)) -> Principal:
         user_role = getattr(current_user, 'role', None)
 
         if required_roles and user_role not in required_roles:
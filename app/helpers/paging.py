@@ -1,14 +1,23 @@
+import base64
+import functools
+import hashlib
 import logging
-from pydantic import BaseModel, conint, ConfigDict
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+import orjson
+from pydantic import BaseModel, conint, ConfigDict, TypeAdapter
 from abc import ABC, abstractmethod
-from typing import Optional, Generic, Sequence, Type, TypeVar, Callable
+from typing import Any, Optional, Generic, Sequence, Type, TypeVar, Callable, Tuple
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from contextvars import ContextVar
-from sqlalchemy import asc, desc, func, select
+from sqlalchemy import asc, desc, func, select, text, tuple_
 from sqlalchemy.sql.selectable import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .bases import ResponseSchemaBase, MetadataSchema
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
 from app.helpers.exception_handler import CustomException,ExceptionType
 
 T = TypeVar("T")
@@ -22,6 +31,30 @@ class PaginationParams(BaseModel):
     page: Optional[conint(gt=0)] = 1
     sort_by: Optional[str] = 'id'
     order: Optional[str] = 'desc'
+    # Cursor mode (keyset): truyền next_cursor/prev_cursor của trang trước
+    after: Optional[str] = None
+    before: Optional[str] = None
+    # Infinite scroll không cần tổng số -> bỏ hẳn câu count
+    with_total: bool = True
+
+
+def pagination_params(*sortable: str):
+    """
+    Dependency factory: chỉ cho sort_by theo các cột có index phù hợp với
+    filter của endpoint, để không câu list nào phải sort cả bảng.
+    """
+    sortable = sortable or ('id',)
+
+    def dependency(params: PaginationParams = Depends()) -> PaginationParams:
+        if params.sort_by not in sortable:
+            raise CustomException(error_type=ExceptionType.INVALID_SORT,
+                                  custom_message=f"sort_by chỉ nhận: {', '.join(sortable)}")
+        if params.order not in ('asc', 'desc'):
+            raise CustomException(error_type=ExceptionType.INVALID_SORT,
+                                  custom_message="order chỉ nhận: asc, desc")
+        return params
+
+    return dependency
 
 
 class BasePage(ResponseSchemaBase, Generic[T], ABC):
@@ -54,36 +87,252 @@ class Page(BasePage[T], Generic[T]):
 PageType: ContextVar[Type[BasePage]] = ContextVar("PageType", default=Page)
 
 
+def _encode_cursor(sort_value: Any, row_id: int) -> str:
+    raw = orjson.dumps([sort_value, row_id], default=str)
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _decode_cursor(cursor: str, sort_column) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = orjson.loads(raw)
+        # JSON làm mất kiểu của datetime/Decimal -> đổi lại theo kiểu của cột
+        python_type = sort_column.type.python_type
+        if sort_value is not None and python_type in (datetime, date):
+            sort_value = python_type.fromisoformat(sort_value)
+        elif sort_value is not None and python_type is Decimal:
+            sort_value = Decimal(sort_value)
+        return sort_value, int(row_id)
+    except Exception:
+        raise CustomException(error_type=ExceptionType.INVALID_CURSOR)
+
+
+async def _estimate_count(db: AsyncSession, model, query: Select) -> Optional[int]:
+    """Ước lượng từ statistics của Postgres, trả None nếu không ước lượng được."""
+    try:
+        if query.whereclause is None:
+            estimate = await db.scalar(
+                text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)'),
+                {'table': model.__tablename__}
+            )
+        else:
+            statement = query.compile(dialect=db.get_bind().dialect,
+                                      compile_kwargs={'literal_binds': True})
+            plan = await db.scalar(text(f'EXPLAIN (FORMAT JSON) {statement}'))
+            if isinstance(plan, (str, bytes)):
+                plan = orjson.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+    except Exception as e:
+        logger.warning(f'Could not estimate row count: {e}')
+        return None
+    # reltuples = -1 khi bảng chưa từng được ANALYZE
+    return int(estimate) if estimate is not None and estimate >= 0 else None
+
+
+# Cache key của SQLAlchemy (cấu trúc query, không gồm tham số) -> SQL đã compile.
+# Mỗi cấu trúc chỉ compile một lần cho mỗi worker; SQL giống nhau giữa các worker
+# nên key trên Redis dùng chung được
+_count_sql_by_shape: 'OrderedDict[Any, str]' = OrderedDict()
+COUNT_SQL_CACHE_SIZE = 512
+
+
+def _count_cache_key(db: AsyncSession, query: Select) -> str:
+    """Chữ ký của query đã filter: SQL đã compile cùng giá trị các tham số."""
+    cache_key = query._generate_cache_key()
+    if cache_key is None:
+        compiled = query.compile(dialect=db.get_bind().dialect)
+        signature = f'{compiled}|{sorted(compiled.params.items())!r}'
+    else:
+        sql = _count_sql_by_shape.get(cache_key.key)
+        if sql is None:
+            sql = str(query.compile(dialect=db.get_bind().dialect))
+            _count_sql_by_shape[cache_key.key] = sql
+            if len(_count_sql_by_shape) > COUNT_SQL_CACHE_SIZE:
+                _count_sql_by_shape.popitem(last=False)
+        else:
+            _count_sql_by_shape.move_to_end(cache_key.key)
+        # Thứ tự bindparams cố định theo cấu trúc query
+        signature = f'{sql}|{[param.effective_value for param in cache_key.bindparams]!r}'
+    return 'count:' + hashlib.blake2b(signature.encode(), digest_size=16).hexdigest()
+
+
+async def _cached_count(key: str) -> Optional[int]:
+    try:
+        cached = await get_redis_client().get(key)
+        return int(cached) if cached is not None else None
+    except Exception as e:
+        logger.warning(f'Count cache unavailable: {e}')
+        return None
+
+
+async def _store_count(key: str, total: int) -> None:
+    try:
+        await get_redis_client().set(key, total, ex=settings.PAGINATION_COUNT_TTL)
+    except Exception as e:
+        logger.warning(f'Count cache unavailable: {e}')
+
+
+async def _exact_count(db: AsyncSession, query: Select) -> int:
+    """count(*) trên chính query đã filter, cache theo chữ ký của query."""
+    key = _count_cache_key(db, query)
+    total = await _cached_count(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        await _store_count(key, total)
+    return total
+
+
+async def _count(db: AsyncSession, model, query: Select,
+                 params: PaginationParams, estimate: bool) -> Optional[int]:
+    if not params.with_total:
+        return None
+    query = query.order_by(None)
+    if estimate and db.get_bind().dialect.name == 'postgresql':
+        total = await _estimate_count(db, model, query)
+        if total is not None:
+            return total
+    return await _exact_count(db, query)
+
+
+@functools.lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def _fetch(result, columns: bool) -> list:
+    """columns=True: giữ nguyên Row, không qua ORM (không identity map)."""
+    return list(result.all() if columns else result.unique().scalars().all())
+
+
+def _map(data: Sequence, mapper: Optional[Callable], schema: Optional[Type[BaseModel]]) -> Sequence:
+    if schema is not None:
+        # Validate cả trang trong một lần gọi thay vì model_validate từng dòng
+        return _list_adapter(schema).validate_python(data, from_attributes=True)
+    return [mapper(item) for item in data] if mapper else data
+
+
+async def _paginate_keyset(db: AsyncSession, model, query: Select,
+                           params: PaginationParams, estimate: bool,
+                           columns: bool) -> Tuple[Sequence, MetadataSchema]:
+    """
+    Keyset pagination: WHERE (sort_col, id) < (cursor) thay cho OFFSET, nên độ trễ
+    không phụ thuộc vào độ sâu của trang. Cột sort không được NULL.
+    """
+    total = await _count(db, model, query, params, estimate)
+    sort_column = getattr(model, params.sort_by)
+    descending = params.order != 'asc'
+    backward = params.before is not None
+    sort_value, row_id = _decode_cursor(params.before if backward else params.after, sort_column)
+
+    key = tuple_(sort_column, model.id) if params.sort_by != 'id' else model.id
+    bound = tuple_(sort_value, row_id) if params.sort_by != 'id' else row_id
+    # Đi lùi = đảo chiều so sánh và chiều sort, rồi đảo lại kết quả
+    if descending != backward:
+        query = query.filter(key < bound)
+        direction = desc
+    else:
+        query = query.filter(key > bound)
+        direction = asc
+    order_by = [direction(model.id)] if params.sort_by == 'id' else [direction(sort_column), direction(model.id)]
+
+    result = await db.execute(query.order_by(*order_by).limit(params.page_size + 1))
+    data = _fetch(result, columns)
+    has_more = len(data) > params.page_size
+    data = data[:params.page_size]
+    if backward:
+        data.reverse()
+
+    def cursor_of(item) -> str:
+        return _encode_cursor(getattr(item, params.sort_by), item.id)
+
+    next_cursor = prev_cursor = None
+    if data:
+        # Có cursor đầu vào nghĩa là phía bên kia chắc chắn còn dữ liệu
+        if has_more or backward:
+            next_cursor = cursor_of(data[-1])
+        if has_more or not backward:
+            prev_cursor = cursor_of(data[0])
+
+    metadata = MetadataSchema(
+        current_page=params.page,
+        page_size=params.page_size,
+        total_items=total,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
+    )
+    return data, metadata
+
+
 async def paginate(db: AsyncSession,
                    model,
                    query: Select, # ✅ Nhận đối tượng Select
                    params: Optional[PaginationParams],
-                   mapper: Optional[Callable] = None) -> BasePage:
+                   mapper: Optional[Callable] = None,
+                   estimate_total: bool = False,
+                   schema: Optional[Type[BaseModel]] = None) -> BasePage:
+    """
+    estimate_total=True: dùng ước lượng của Postgres (reltuples/EXPLAIN) thay
+    cho count(*) chính xác, hợp với danh sách lớn ít filter ở trang admin.
+    schema: fast path cho list chỉ đọc. `query` chọn các cột (select(Model.id, ...),
+    phải có id và cột sort), các Row được validate thẳng thành `schema`,
+    không dựng ORM object; `mapper` bị bỏ qua.
+    """
+    columns = schema is not None
     code = '200'
     message = 'Success'
 
     try:
-        count_query = select(func.count()).select_from(model)
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one()
+        if params.after is not None or params.before is not None:
+            with db.no_autoflush:
+                data, metadata = await _paginate_keyset(db, model, query, params, estimate_total, columns)
+            return PageType.get().create(code, message, _map(data, mapper, schema), metadata)
+
+        # Count chính xác chưa có trong cache -> lấy luôn bằng count(*) OVER ()
+        # trong câu lấy dữ liệu, chỉ tốn một round trip tới DB
+        use_window = False
+        total = None
+        if params.with_total and not estimate_total:
+            count_key = _count_cache_key(db, query.order_by(None))
+            total = await _cached_count(count_key)
+            use_window = total is None
+        else:
+            total = await _count(db, model, query, params, estimate_total)
 
         if params.order:
             direction = desc if params.order == 'desc' else asc
             query = query.order_by(direction(getattr(model, params.sort_by)))
+            if params.sort_by != 'id':
+                # id làm tiebreak để thứ tự ổn định giữa các trang
+                query = query.order_by(direction(model.id))
 
         query = query.limit(params.page_size).offset(params.page_size * (params.page - 1))
-        data_result = await db.execute(query)
-        data = data_result.unique().scalars().all()
+        with db.no_autoflush:
+            if use_window:
+                result = await db.execute(query.add_columns(func.count().over().label('total_count')))
+                rows = result.all() if columns else result.unique().all()
+                # Ở column mode cột total thừa ra bị schema bỏ qua
+                data = rows if columns else [row[0] for row in rows]
+                if rows:
+                    total = rows[0][-1]
+                    await _store_count(count_key, total)
+                else:
+                    # Trang vượt quá cuối danh sách: không có dòng nào mang total
+                    total = await _exact_count(db, query.limit(None).offset(None).order_by(None))
+            else:
+                data = _fetch(await db.execute(query), columns)
 
-        if mapper:
-            mapped_data = [mapper(item) for item in data]
-        else:
-            mapped_data = data
+        mapped_data = _map(data, mapper, schema)
+
+        # Trang đầy -> trả cursor để client chuyển sang cursor mode ở trang sau
+        next_cursor = None
+        if params.order and len(data) == params.page_size:
+            next_cursor = _encode_cursor(getattr(data[-1], params.sort_by), data[-1].id)
 
         metadata = MetadataSchema(
             current_page=params.page,
             page_size=params.page_size,
-            total_items=total
+            total_items=total,
+            next_cursor=next_cursor
         )
 
     except Exception as e:
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import uvicorn
@@ -8,7 +9,17 @@ from minio.error import S3Error
 
 from . import routers
 from .helpers.bases import Base
-from app.db.base import engine
+from app.db.base import engine, replicas
+from app.core import redis_pubsub
+from app.db.statements import warm_up as warm_up_statements
+from app.core.redis_client import init_redis_client, close_redis_client
+from app.core.payos_client import init_payos_client, close_payos_client
+from app.core.security import password_hasher
+from app.features.auth.revocation import run_revocation_resync_loop
+from app.features.auth.maintenance import run_token_purge_loop
+from app.features.campaigns.counters import run_counter_fold_loop
+from app.features.transaction.settlement import consumer_names, run_settlement_worker
+from app.features.transaction.webhook_stream import close_blocking_client
 from app.core.config import settings
 from app.helpers.exception_handler import CustomException, http_exception_handler
 
@@ -69,6 +80,34 @@ def get_application() -> FastAPI:
     async def on_startup():
         init_minio()
         # await create_db_and_tables()
+        init_redis_client()
+        init_payos_client()
+        # Compile và prepare sẵn các truy vấn nóng trên mọi connection của pool
+        await warm_up_statements(engine, settings.DB_POOL_SIZE)
+        # Bloom filter của token bị thu hồi được nạp từ DB mỗi khi pub/sub (re)subscribe
+        redis_pubsub.start()
+        application.state.background_tasks = []
+        if settings.REVOKED_TOKEN_RESYNC_INTERVAL_SECONDS > 0:
+            application.state.background_tasks.append(asyncio.create_task(run_revocation_resync_loop()))
+        if settings.TOKEN_PURGE_INTERVAL_SECONDS > 0:
+            application.state.background_tasks.append(asyncio.create_task(run_token_purge_loop()))
+        if settings.CAMPAIGN_COUNTER_FOLD_INTERVAL_SECONDS > 0:
+            application.state.background_tasks.append(asyncio.create_task(run_counter_fold_loop()))
+        if replicas:
+            application.state.background_tasks.append(asyncio.create_task(replicas.run_health_loop()))
+        for consumer in consumer_names(settings.WEBHOOK_WORKERS):
+            application.state.background_tasks.append(asyncio.create_task(run_settlement_worker(consumer)))
+
+    @application.on_event("shutdown")
+    async def on_shutdown():
+        for task in application.state.background_tasks:
+            task.cancel()
+        await asyncio.gather(*application.state.background_tasks, return_exceptions=True)
+        await redis_pubsub.stop()
+        await close_blocking_client()
+        await close_redis_client()
+        await close_payos_client()
+        password_hasher.shutdown()
 
     application.add_middleware(
         CORSMiddleware,
@@ -5,10 +5,12 @@ from .features.auth import router as auth_router
 from .features.files import routers as file_router
 from .features.campaigns import routers as campaign_router
 from .features.transaction import routers as transaction_router
+from .features.system import routers as system_router
 router = APIRouter()
 
 router.include_router(user_router.router, tags=["users"], prefix="/users")
 router.include_router(auth_router.router, tags=['AUTH'], prefix="/auth")
 router.include_router(file_router.router, tags=['files'],prefix='/upload')
 router.include_router(campaign_router.router, tags=['Campaign'], prefix='/campaign')
-router.include_router(transaction_router.router, tags=['Transaction'], prefix='/transaction')
\ No newline at end of file
+router.include_router(transaction_router.router, tags=['Transaction'], prefix='/transaction')
+router.include_router(system_router.router, tags=['System'], prefix='/system')
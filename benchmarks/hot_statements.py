@@ -0,0 +1,94 @@
+"""
+So sánh chi phí phía Python của các truy vấn nóng:
+- select:  dựng select() mới cho mỗi request (như trước đây)
+- lambda:  lambda_stmt dựng sẵn (app.db.statements.hot_statement)
+
+Mỗi truy vấn đo hai mức:
+- build:   dựng câu lệnh + tính cache key (phần lambda_stmt bỏ được khỏi request)
+- execute: build + chạy trên SQLite in-memory (1 dòng) + lấy kết quả
+
+Chạy:
+    python -m benchmarks.hot_statements
+(cần các biến môi trường như khi chạy app, vì model import app.core.config)
+"""
+import time
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, raiseload, selectinload
+
+import app.main  # noqa: F401  nạp đủ model để configure mapper
+from app.db.base import Base
+from app.features.auth.principal import _principal_query
+from app.features.campaigns.models import Campaign, CampaignCounterShard
+from app.features.campaigns.services import _detail_query
+from app.features.transaction.models import Donation
+from app.features.users.models import User, UserProfile
+from app.helpers.deps import _user_query
+
+ROUNDS = 5000
+
+# tên -> (dựng bằng select() mỗi lần, hàm dựng bằng lambda_stmt, tham số)
+CASES = {
+    'principal': (
+        lambda user_id: select(User.id, User.role, User.status).where(User.id == user_id),
+        _principal_query, {'user_id': 1},
+    ),
+    'user': (
+        lambda user_id: select(User).options(raiseload(User.campaign)).where(User.id == user_id),
+        _user_query, {'user_id': 1},
+    ),
+    'campaign': (
+        lambda campaign_id: select(Campaign).options(
+            selectinload(Campaign.creator).selectinload(User.user_profile)
+        ).where(Campaign.id == campaign_id),
+        _detail_query, {'campaign_id': 1},
+    ),
+}
+
+
+def _seed(session: Session) -> None:
+    user = User(id=1, email='bench@example.com', hash_password='x', user_profile=UserProfile(email='bench@example.com'))
+    session.add_all([
+        user,
+        Campaign(id=1, title='bench', description='bench', cover_image_url='', goal_amount=Decimal(1),
+                 end_date=date.today(), creator=user),
+        Donation(id=1, campaign_id=1, amount=Decimal(0), message='', code='TSS1'),
+    ])
+    session.commit()
+
+
+def _rate(fn) -> float:
+    fn()  # warm-up (điền compiled cache)
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return ROUNDS / (time.perf_counter() - started)
+
+
+def main() -> None:
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, UserProfile.__table__, Campaign.__table__, CampaignCounterShard.__table__,
+        Donation.__table__,
+    ])
+    with Session(engine) as session:
+        _seed(session)
+        print(f'{"query":<10} {"build select":>14} {"build lambda":>14} {"exec select":>13} {"exec lambda":>13}')
+        for name, (build_select, build_lambda, params) in CASES.items():
+            def execute(builder):
+                session.execute(builder(**params)).all()
+                session.expunge_all()
+
+            rates = [
+                _rate(lambda: build_select(**params)._generate_cache_key()),
+                _rate(lambda: build_lambda(**params)._generate_cache_key()),
+                _rate(lambda: execute(build_select)),
+                _rate(lambda: execute(build_lambda)),
+            ]
+            print(f'{name:<10} {rates[0]:>12,.0f}/s {rates[1]:>12,.0f}/s {rates[2]:>11,.0f}/s {rates[3]:>11,.0f}/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+So sánh tốc độ dựng một trang 1000 donation:
+- orm:     select(Donation) -> ORM object (identity map) -> model_validate từng dòng
+- columns: select(các cột) -> Row -> TypeAdapter(list[schema]) một lần (fast path của paginate())
+
+Chạy với SQLite in-memory để chỉ đo phần xử lý trong Python, không tính I/O DB:
+    python -m benchmarks.paginate_fast_path
+(cần các biến môi trường như khi chạy app, vì model import app.core.config)
+"""
+import time
+from decimal import Decimal
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  nạp đủ model để configure mapper
+from app.features.transaction.models import Donation
+from app.features.transaction.schemas import DonationSummaryResponse
+from app.features.transaction.services import DONATION_SUMMARY_COLUMNS
+
+PAGE_SIZE = 1000
+ROUNDS = 50
+
+
+def _seed(session: Session) -> None:
+    session.add_all([
+        Donation(id=i, campaign_id=1, amount=Decimal('50000.00'), message=f'donation {i}',
+                 user_name=f'user {i}', status='success', bank_name='VCB', bank_number='0123456789')
+        for i in range(1, PAGE_SIZE + 1)
+    ])
+    session.commit()
+
+
+def _orm_page(session: Session) -> list:
+    donations = session.scalars(select(Donation).order_by(Donation.id.desc()).limit(PAGE_SIZE)).all()
+    page = [DonationSummaryResponse.model_validate(donation) for donation in donations]
+    # Mỗi request là một session mới, identity map không được dùng lại
+    session.expunge_all()
+    return page
+
+
+def _columns_page(session: Session, adapter: TypeAdapter) -> list:
+    rows = session.execute(select(*DONATION_SUMMARY_COLUMNS).order_by(Donation.id.desc()).limit(PAGE_SIZE)).all()
+    return adapter.validate_python(rows, from_attributes=True)
+
+
+def _measure(name: str, build) -> float:
+    build()  # warm-up
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        page = build()
+    elapsed = time.perf_counter() - started
+    assert len(page) == PAGE_SIZE
+    rate = PAGE_SIZE * ROUNDS / elapsed
+    print(f'{name:<8} {rate:>12,.0f} rows/s  ({elapsed / ROUNDS * 1000:.2f} ms/page)')
+    return rate
+
+
+def main() -> None:
+    engine = create_engine('sqlite://')
+    Donation.__table__.create(engine)
+    with Session(engine) as session:
+        _seed(session)
+        adapter = TypeAdapter(list[DonationSummaryResponse])
+        orm_rate = _measure('orm', lambda: _orm_page(session))
+        columns_rate = _measure('columns', lambda: _columns_page(session, adapter))
+    print(f'speedup  {columns_rate / orm_rate:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Server giả lập API tạo link thanh toán của PayOS, để test/benchmark create_donation
+mà không gọi PayOS thật. Response được ký bằng PAYOS_CHECKSUM_KEY như PayOS.
+
+Chạy:
+    uvicorn benchmarks.payos_stub:app --port 9100
+rồi chạy app với PAYOS_BASE_URL=http://localhost:9100
+
+Biến môi trường:
+    PAYOS_STUB_LATENCY_MS   độ trễ mỗi request (mặc định 150)
+    PAYOS_STUB_ERROR_RATE   tỉ lệ trả 503, để thử retry/circuit breaker (mặc định 0)
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from payos.utils import createSignatureFromObj
+
+CHECKSUM_KEY = os.environ.get('PAYOS_CHECKSUM_KEY', '')
+LATENCY_MS = float(os.environ.get('PAYOS_STUB_LATENCY_MS', 150))
+ERROR_RATE = float(os.environ.get('PAYOS_STUB_ERROR_RATE', 0))
+
+app = FastAPI()
+
+
+@app.post('/v2/payment-requests')
+async def create_payment_request(request: Request):
+    await asyncio.sleep(LATENCY_MS / 1000)
+    if random.random() < ERROR_RATE:
+        return JSONResponse(status_code=503, content={'code': '503', 'desc': 'stub unavailable'})
+    body = await request.json()
+    payment_link_id = f'stub{body["orderCode"]}'
+    data = {
+        'bin': '970422',
+        'accountNumber': '0000000000',
+        'accountName': 'BRIGHT MIND',
+        'amount': body['amount'],
+        'description': body['description'],
+        'orderCode': body['orderCode'],
+        'currency': 'VND',
+        'paymentLinkId': payment_link_id,
+        'status': 'PENDING',
+        'checkoutUrl': f'https://pay.payos.vn/web/{payment_link_id}',
+        'qrCode': '',
+    }
+    return {'code': '00', 'desc': 'success', 'data': data,
+            'signature': createSignatureFromObj(data, CHECKSUM_KEY)}
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+import httpx
+
+from app.db.base import get_db
+from app.features.auth.schemas import Principal
+from app.features.campaigns.routers import get_campaign_service
+from app.features.campaigns.schemas import CampaignResponse
+from app.helpers.deps import get_current_principal
+from app.helpers.exception_handler import CustomException, ExceptionType
+from app.main import app
+
+
+class FakeCampaignService:
+    def __init__(self):
+        self.campaigns = {}
+
+    async def create_campaign(self, data, db, user):
+        campaign = CampaignResponse(
+            id=len(self.campaigns) + 1, title=data.title, goal_amount=data.goal_amount, start_date=None,
+            created_at=datetime.now(), updated_at=datetime.now(), status='pending',
+            current_amount=Decimal(0), used_amount=Decimal(0), creator=None,
+            end_date=date.today(), quickly_used=False,
+        )
+        self.campaigns[campaign.id] = campaign
+        return campaign
+
+    async def get_detail(self, campaign_id, db):
+        if campaign_id not in self.campaigns:
+            raise CustomException(ExceptionType.CAMPAIGN_NOT_FOUND)
+        return self.campaigns[campaign_id]
+
+
+async def _no_db():
+    yield None
+
+
+def test_detail_not_found_is_not_cached_past_create(fake_redis):
+    service = FakeCampaignService()
+    app.dependency_overrides.update({
+        get_db: _no_db,
+        get_campaign_service: lambda: service,
+        get_current_principal: lambda: Principal(id=1, role='user', status='active'),
+    })
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            miss = await client.get('/api/campaign/detail/1')
+            assert miss.status_code == 404
+
+            created = await client.post('/api/campaign', json={
+                'title': 'new', 'goal_amount': '1000', 'start_date': None,
+            })
+            assert created.status_code == 200
+            assert created.json()['data']['id'] == 1
+
+            detail = await client.get('/api/campaign/detail/1')
+            assert detail.status_code == 200
+            assert detail.json()['data']['title'] == 'new'
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+from app.core.security import PasswordHasher
+
+
+def test_cancelled_caller_keeps_job_counted_until_thread_finishes():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(hasher._run(release.wait))
+        queued = asyncio.create_task(hasher._run(lambda: 'done'))
+        await asyncio.sleep(0.05)
+        assert hasher.stats()['in_flight'] == 2
+
+        # Client ngắt kết nối: job đang chạy vẫn chiếm thread
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+        assert hasher.stats()['in_flight'] == 2
+        assert hasher.stats()['queued'] == 1
+
+        release.set()
+        assert await queued == 'done'
+        await asyncio.sleep(0.05)
+        stats = hasher.stats()
+        assert stats['in_flight'] == 0
+        assert stats['completed'] == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+
+from app.core.security import create_access_token
+from app.db.base import get_db
+from app.features.auth.principal import principal_cache
+from app.features.users.models import User, UserProfile
+from app.main import app
+
+
+def test_ban_evicts_cached_principal_and_rejects_next_request(fake_redis, sqlite_sessionmaker):
+    sessionmaker, create_tables, engine = sqlite_sessionmaker
+    principal_cache.clear()
+
+    async def override_get_db():
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    async def scenario():
+        await create_tables()
+        async with sessionmaker() as db:
+            admin = User(id=1, email='admin@example.com', hash_password='x', role='admin',
+                         user_profile=UserProfile(email='admin@example.com'))
+            user = User(id=2, email='user@example.com', hash_password='x', role='user',
+                        user_profile=UserProfile(email='user@example.com'))
+            db.add_all([admin, user])
+            await db.commit()
+        admin_headers = {'Authorization': f'Bearer {create_access_token(admin)}'}
+        user_headers = {'Authorization': f'Bearer {create_access_token(user)}'}
+        campaign = {'title': 'c', 'goal_amount': '1000', 'start_date': None}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            # Principal 'active' của user được cache sau request này
+            assert (await client.post('/api/campaign', json=campaign, headers=user_headers)).status_code == 200
+            digest = principal_cache.digest(user_headers['Authorization'].split()[1])
+            assert principal_cache.get(digest)[0].status == 'active'
+
+            banned = await client.patch('/api/users/ban/2', headers=admin_headers)
+            assert banned.status_code == 200
+            assert principal_cache.get(digest) is None
+
+            # Request kế tiếp nạp lại principal với status 'banned'
+            rejected = await client.post('/api/campaign', json=campaign, headers=user_headers)
+            assert rejected.status_code == 400
+            assert rejected.json()['code'] == '1006'
+        await engine.dispose()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+        principal_cache.clear()